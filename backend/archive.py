@@ -0,0 +1,135 @@
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import DateTime, String, delete, insert, literal, select
+from sqlalchemy.orm import Session, joinedload
+
+from . import models, stats, tasks, changes
+
+# Statuses an archived item can be restored to
+RESTORE_STATUSES = ("draft", "published")
+MOVE_BATCH_SIZE = 1000
+
+
+def _move(db: Session, source, target, ids: List[int], overrides: dict, extra: dict) -> None:
+    """Copy rows ``ids`` from ``source`` to ``target`` in one INSERT ... SELECT, then delete them.
+
+    ``overrides`` replaces copied column values; ``extra`` fills target-only columns.
+    """
+    names = [column.name for column in target.__table__.columns if column.name not in extra]
+    values = [overrides.get(name, source.__table__.c[name]) for name in names]
+    db.execute(
+        insert(target).from_select(names + list(extra), select(*values, *extra.values()).where(source.id.in_(ids)))
+    )
+    db.execute(delete(source).where(source.id.in_(ids)))
+
+
+def archive(db: Session, content_type: str, ids: Iterable[int]) -> List[int]:
+    """Move items into the archive tier, marking them archived. Returns the ids moved.
+
+    Items keep their id, so links and section indexes stay valid.
+    The caller commits.
+    """
+    model = models.CONTENT_MODELS[content_type]
+    rows = db.execute(select(model.id, model.status).where(model.id.in_(list(ids)))).all()
+    if not rows:
+        return []
+    moved = [row.id for row in rows]
+    # The counters keep archived items, now under status "archived"
+    deltas = Counter()
+    for row in rows:
+        if row.status != "archived":
+            deltas[(content_type, "status", row.status)] -= 1
+            deltas[(content_type, "status", "archived")] += 1
+    now = datetime.utcnow()
+    stamp = literal(now, DateTime())
+    _move(
+        db, model, models.ARCHIVE_MODELS[content_type], moved,
+        {"status": literal("archived", String()), "updated_at": stamp},
+        {"archived_at": stamp},
+    )
+    stats.apply_deltas(db.connection(), deltas)
+    changes.record(db, [
+        changes.make_event(content_type, row.id, "updated", "archived", row.status, now)
+        for row in rows if row.status != "archived"
+    ])
+    return moved
+
+
+def unarchive(db: Session, content_type: str, ids: Iterable[int], status: str = "draft") -> Tuple[List[int], List[int]]:
+    """Move items back to the hot table with ``status``.
+
+    Returns the ids restored and the ids left archived because a hot item
+    already uses their slug (or id). The caller commits.
+    """
+    model = models.CONTENT_MODELS[content_type]
+    archived_model = models.ARCHIVE_MODELS[content_type]
+    rows = db.execute(
+        select(archived_model.id, archived_model.slug).where(archived_model.id.in_(list(ids)))
+    ).all()
+    if not rows:
+        return [], []
+    taken = set(db.execute(select(model.slug).where(model.slug.in_([row.slug for row in rows]))).scalars())
+    # SQLite tables created before the archive tier may have reused an archived id
+    taken_ids = set(db.execute(select(model.id).where(model.id.in_([row.id for row in rows]))).scalars())
+    restored = [row.id for row in rows if row.slug not in taken and row.id not in taken_ids]
+    conflicts = [row.id for row in rows if row.slug in taken or row.id in taken_ids]
+    if not restored:
+        return [], conflicts
+
+    now = datetime.utcnow()
+    stamp = literal(now, DateTime())
+    overrides = {"status": literal(status, String()), "updated_at": stamp}
+    if status == "published":
+        overrides["published_at"] = stamp
+    _move(db, archived_model, model, restored, overrides, {})
+    stats.apply_deltas(db.connection(), Counter({
+        (content_type, "status", "archived"): -len(restored),
+        (content_type, "status", status): len(restored),
+    }))
+    changes.record(db, [
+        changes.make_event(content_type, item_id, "updated", status, "archived", now)
+        for item_id in restored
+    ])
+    if status == "published":
+        tasks.enqueue_many(db, "publish", content_type, restored)
+    return restored, conflicts
+
+
+def get_archived(db: Session, content_type: str, item_id: int):
+    archived_model = models.ARCHIVE_MODELS[content_type]
+    return (
+        db.query(archived_model)
+        .options(joinedload(archived_model.author))
+        .filter(archived_model.id == item_id)
+        .first()
+    )
+
+
+def archive_item(db: Session, content_type: str, item):
+    """Archive an item whose status was just set to archived, commit, and return its archived row."""
+    db.flush()
+    item_id = item.id
+    archive(db, content_type, [item_id])
+    db.commit()
+    return get_archived(db, content_type, item_id)
+
+
+def slug_taken(db: Session, content_type: str, slug: str) -> bool:
+    """Whether ``slug`` is used in either tier, so restoring never collides."""
+    return any(
+        db.query(model.id).filter(model.slug == slug).first() is not None
+        for model in (models.CONTENT_MODELS[content_type], models.ARCHIVE_MODELS[content_type])
+    )
+
+
+def ensure_initialized(db: Session) -> None:
+    """Move rows archived before the archive tier existed out of the hot tables."""
+    for content_type, model in models.CONTENT_MODELS.items():
+        ids = db.execute(select(model.id).where(model.status == "archived")).scalars().all()
+        for start in range(0, len(ids), MOVE_BATCH_SIZE):
+            archive(db, content_type, ids[start:start + MOVE_BATCH_SIZE])
+        if ids:
+            print(f"Moved {len(ids)} archived {content_type} to the archive tier")
+    db.commit()
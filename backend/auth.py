@@ -1,18 +1,21 @@
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from .db import get_db
-from . import models, schemas
+from .db import SessionLocal
+from . import models, schemas, invalidation
 
 # Configuration
 SECRET_KEY = "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # Increased from 30 to 60 minutes
+TOKEN_STATE_REFRESH_SECONDS = 30  # upper bound on how long a revoked token keeps working
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
@@ -32,7 +35,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     print(f"Token created for user {data.get('sub')} with expiration: {expire}")
     return encoded_jwt
@@ -43,10 +46,18 @@ def verify_token(token: str, credentials_exception: HTTPException) -> schemas.To
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
-            print(f"Token verification failed: no username in payload")
+        user_id: int = payload.get("uid")
+        # Tokens issued before claims were added carry no user id; make them log in again
+        if username is None or user_id is None:
+            print(f"Token verification failed: missing claims in payload")
             raise credentials_exception
-        token_data = schemas.TokenData(username=username)
+        token_data = schemas.TokenData(
+            username=username,
+            user_id=user_id,
+            is_admin=payload.get("adm", False),
+            token_version=payload.get("ver", 0),
+            issued_at=payload.get("iat"),
+        )
         print(f"Token verified successfully for user: {username}")
     except JWTError as e:
         print(f"Token verification failed with JWTError: {e}")
@@ -55,28 +66,113 @@ def verify_token(token: str, credentials_exception: HTTPException) -> schemas.To
     return token_data
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> models.User:
+def token_claims(user: models.User) -> dict:
+    return {"sub": user.username, "uid": user.id, "adm": user.is_admin, "ver": user.token_version}
+
+
+class TokenStateCache:
+    """Current token version and role of every user whose token claims can go stale.
+
+    Only admins and users whose token version changed within the last
+    ACCESS_TOKEN_EXPIRE_MINUTES are held: anyone else's unexpired tokens were
+    all issued after their last change, so they carry the current version.
+    Reloaded when the users table changes in any worker, and at least every
+    TOKEN_STATE_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        self._state: Dict[int, Tuple[int, bool]] = {}
+        self._loaded_at = 0.0
+        self.loaded_at_wall = 0.0  # time.time() of the last load, comparable with token iat
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def mark_stale(self, table: str = "users") -> None:
+        self._stale = True
+
+    def age(self) -> float:
+        return time.monotonic() - self._loaded_at
+
+    def is_stale(self) -> bool:
+        return self._stale or self.age() > TOKEN_STATE_REFRESH_SECONDS
+
+    def _reload(self) -> None:
+        changed_since = datetime.utcnow() - timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        columns = (models.User.id, models.User.token_version, models.User.is_admin)
+        db = SessionLocal()
+        try:
+            # Two indexed lookups rather than one OR that would scan users
+            rows = db.query(*columns).filter(models.User.is_admin == True).all()
+            rows += db.query(*columns).filter(models.User.token_version_changed_at >= changed_since).all()
+        finally:
+            db.close()
+        self._state = {user_id: (version, is_admin) for user_id, version, is_admin in rows}
+
+    def refresh(self) -> None:
+        """Reload the map if it is stale. Queries the database, so keep it off the event loop."""
+        with self._lock:
+            if not self.is_stale():
+                return
+            self._stale = False
+            self._loaded_at = time.monotonic()
+            self.loaded_at_wall = time.time()
+            try:
+                self._reload()
+            except Exception:
+                self._stale = True
+                raise
+
+    def get(self, user_id: int) -> Optional[Tuple[int, bool]]:
+        return self._state.get(user_id)
+
+    def accepts(self, token_data: schemas.TokenData) -> bool:
+        state = self._state.get(token_data.user_id)
+        if state is None:
+            # Admins are always held, so an admin claim for anyone else is stale
+            return not token_data.is_admin
+        return state == (token_data.token_version, token_data.is_admin)
+
+
+token_state = TokenStateCache()
+invalidation.subscribe("users", token_state.mark_stale)
+
+
+async def token_is_current(token_data: schemas.TokenData) -> bool:
+    """Whether the token's version and role still match the user's."""
+    if token_state.is_stale():
+        await run_in_threadpool(token_state.refresh)
+    if token_state.accepts(token_data):
+        return True
+    # A token issued after the last load may reflect a change another worker
+    # just wrote; older tokens (such as revoked ones) never force a reload
+    issued_after_load = token_data.issued_at is not None and token_data.issued_at > token_state.loaded_at_wall - 1.0
+    if issued_after_load and token_state.age() > 1.0:
+        token_state.mark_stale()
+        await run_in_threadpool(token_state.refresh)
+        return token_state.accepts(token_data)
+    return False
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> schemas.CurrentUser:
+    """Authorize from the token's claims; no users query unless the version map is stale"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     token_data = verify_token(token, credentials_exception)
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
-    if user is None:
-        print(f"User not found in database: {token_data.username}")
+    # A logout or role change bumps the user's state; tokens minted before it no longer match
+    if not await token_is_current(token_data):
+        print(f"Token for user {token_data.username} is revoked or has a stale role")
         raise credentials_exception
-    print(f"Current user retrieved: {user.username} (admin: {user.is_admin})")
-    return user
+    return schemas.CurrentUser(id=token_data.user_id, username=token_data.username, is_admin=token_data.is_admin)
 
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)) -> models.User:
+async def get_current_active_user(current_user: schemas.CurrentUser = Depends(get_current_user)) -> schemas.CurrentUser:
     return current_user
 
 
-async def get_current_admin_user(current_user: models.User = Depends(get_current_active_user)) -> models.User:
+async def get_current_admin_user(current_user: schemas.CurrentUser = Depends(get_current_active_user)) -> schemas.CurrentUser:
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Optional
+
+
+class BackgroundLoop:
+    """An asyncio task, one per worker process, that calls ``step`` every
+    ``interval`` seconds or as soon as it is woken.
+
+    Subclasses implement ``step``; it runs on the event loop, so blocking work
+    belongs in ``asyncio.to_thread``. A truthy return means more work is
+    waiting and the next step runs without sleeping.
+    """
+
+    # Prefix of the message printed when a step raises
+    name = "Background loop"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Run the next step now; safe to call from any thread."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def step(self) -> bool:
+        raise NotImplementedError
+
+    async def _run(self):
+        while True:
+            try:
+                busy = await self.step()
+            except Exception as e:
+                print(f"{self.name} failed: {e}")
+                busy = False
+            if busy:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
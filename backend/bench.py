@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, joinedload, sessionmaker
+
+from .db import Base, DATABASE_URL
+from . import models, schemas, listing
+
+DETAIL_SCHEMAS = {
+    "concepts": schemas.ConceptDetail,
+    "implementations": schemas.ImplementationDetail,
+    "problems": schemas.ProblemDetail,
+}
+
+
+def seed(db: Session, content_type: str, rows: int) -> None:
+    author = models.User(username="bench", email="bench@example.com", hashed_password="x")
+    db.add(author)
+    db.flush()
+    now = datetime.utcnow()
+    body = "# Overview\n" + "Some lesson text with [[concept:basics|Basics]] links.\n" * 40
+    db.execute(insert(models.CONTENT_MODELS[content_type]), [
+        {
+            "slug": f"bench-{i}",
+            "title": f"Bench item {i}",
+            "description": "Generated for benchmarking",
+            "content_mdx": body,
+            "difficulty": ("beginner", "intermediate", "advanced")[i % 3],
+            "tags": "bench,generated",
+            "status": "published",
+            "author_id": author.id,
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": now - timedelta(seconds=i),
+            "published_at": now - timedelta(seconds=i),
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+
+
+def orm_page(db: Session, content_type: str, offset: int, limit: int) -> bytes:
+    """The previous list path: ORM objects with joinedload, pydantic models, JSON."""
+    model = models.CONTENT_MODELS[content_type]
+    items = (
+        db.query(model).filter(model.status == "published")
+        .options(joinedload(model.author))
+        .order_by(model.created_at.desc()).offset(offset).limit(limit).all()
+    )
+    adapter = TypeAdapter(List[DETAIL_SCHEMAS[content_type]])
+    return adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+
+
+def fast_page(db: Session, content_type: str, offset: int, limit: int) -> bytes:
+    model = models.CONTENT_MODELS[content_type]
+    query = db.query(model).filter(model.status == "published")
+    return listing.page_json(listing.page_rows(query, offset, limit))
+
+
+def measure(make_session, page, content_type: str, limit: int, pages: int, repeat: int) -> float:
+    """Best rows/sec over ``repeat`` runs of ``pages`` consecutive pages."""
+    best = 0.0
+    for _ in range(repeat):
+        rows = 0
+        elapsed = 0.0
+        for number in range(pages):
+            # A session per page, like a request
+            started = time.perf_counter()
+            db = make_session()
+            try:
+                body = page(db, content_type, number * limit, limit)
+            finally:
+                db.close()
+            elapsed += time.perf_counter() - started
+            rows += len(json.loads(body))
+        best = max(best, rows / elapsed)
+    return best
+
+
+def run(database_url: str, content_type: str, limit: int, pages: int, repeat: int) -> dict:
+    engine = create_engine(database_url)
+    make_session = sessionmaker(bind=engine)
+    db = make_session()
+    try:
+        if json.loads(orm_page(db, content_type, 0, limit)) != json.loads(fast_page(db, content_type, 0, limit)):
+            raise SystemExit("ORM and fast list paths returned different JSON")
+    finally:
+        db.close()
+    results = {
+        path: measure(make_session, page, content_type, limit, pages, repeat)
+        for path, page in (("orm", orm_page), ("fast", fast_page))
+    }
+    engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.bench",
+        description="Compare list-route throughput of the ORM and column-tuple paths",
+    )
+    parser.add_argument("--type", dest="content_type", choices=sorted(models.CONTENT_MODELS), default="concepts")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--existing", action="store_true",
+                        help="read DATABASE_URL instead of a generated SQLite database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.existing:
+            database_url = DATABASE_URL
+        else:
+            database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            engine = create_engine(database_url)
+            Base.metadata.create_all(bind=engine)
+            with Session(engine) as db:
+                seed(db, args.content_type, args.limit * args.pages)
+            engine.dispose()
+        results = run(database_url, args.content_type, args.limit, args.pages, args.repeat)
+
+    print(f"{args.content_type}, limit={args.limit}, {args.pages} pages, best of {args.repeat}")
+    for path, rows_per_second in results.items():
+        print(f"  {path:>4}: {rows_per_second:10.0f} rows/s  {1000 * args.limit / rows_per_second:7.2f} ms/page")
+    print(f"  speedup: {results['fast'] / results['orm']:.2f}x")
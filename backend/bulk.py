@@ -0,0 +1,79 @@
+from collections import Counter
+from datetime import datetime
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from . import models, tasks, stats, sections, archive, changes
+
+# Bulk action -> status it moves items to
+ACTION_STATUSES = {"publish": "published", "draft": "draft", "archive": "archived"}
+
+
+def apply_action(db: Session, content_type: str, ids: List[int], action: str) -> List[dict]:
+    """Apply ``action`` to many items of one content type in a single transaction.
+
+    Uses one set-based UPDATE or DELETE for all ids that exist and returns a
+    result per requested id, in request order. Ids in the archive tier can be
+    deleted, or restored by publishing or drafting them.
+    """
+    model = models.CONTENT_MODELS[content_type]
+    archived_model = models.ARCHIVE_MODELS[content_type]
+    ids = list(dict.fromkeys(ids))
+    rows = db.query(model.id, model.status, model.difficulty, model.tags).filter(model.id.in_(ids)).all()
+    found = {row.id: row.status for row in rows}
+    archived_rows = db.query(
+        archived_model.id, archived_model.status, archived_model.difficulty, archived_model.tags
+    ).filter(archived_model.id.in_([item_id for item_id in ids if item_id not in found])).all()
+    archived_ids = [row.id for row in archived_rows]
+    # Set-based statements bypass the ORM events that maintain the counters
+    deltas = Counter()
+    events = []
+    errors = {}
+
+    if action == "delete":
+        if found:
+            db.query(model).filter(model.id.in_(list(found))).delete(synchronize_session=False)
+            for row in rows:
+                stats.add_item(deltas, content_type, row, -1)
+        if archived_ids:
+            db.query(archived_model).filter(archived_model.id.in_(archived_ids)).delete(synchronize_session=False)
+            for row in archived_rows:
+                stats.add_item(deltas, content_type, row, -1)
+        for row in rows + archived_rows:
+            events.append(changes.make_event(content_type, row.id, "deleted", None, row.status, None))
+        if found or archived_ids:
+            sections.forget(db, content_type, list(found) + archived_ids)
+        statuses = {item_id: None for item_id in list(found) + archived_ids}
+    elif action == "archive":
+        archive.archive(db, content_type, list(found))
+        statuses = {item_id: "archived" for item_id in list(found) + archived_ids}
+    else:
+        target = ACTION_STATUSES[action]
+        changing = [item_id for item_id, status in found.items() if status != target]
+        for item_id in changing:
+            deltas[(content_type, "status", found[item_id])] -= 1
+            deltas[(content_type, "status", target)] += 1
+        if changing:
+            now = datetime.utcnow()
+            values = {"status": target, "updated_at": now}
+            if target == "published":
+                values["published_at"] = now
+            db.query(model).filter(model.id.in_(changing)).update(values, synchronize_session=False)
+            for item_id in changing:
+                events.append(changes.make_event(content_type, item_id, "updated", target, found[item_id], now))
+            if target == "published":
+                tasks.enqueue_many(db, "publish", content_type, changing)
+        restored, conflicts = archive.unarchive(db, content_type, archived_ids, target)
+        statuses = {item_id: target for item_id in list(found) + restored}
+        errors = {item_id: "Slug already exists" for item_id in conflicts}
+    stats.apply_deltas(db.connection(), deltas)
+    changes.record(db, events)
+    db.commit()
+
+    return [
+        {"id": item_id, "ok": True, "status": statuses[item_id]}
+        if item_id in statuses else
+        {"id": item_id, "ok": False, "detail": errors.get(item_id, "Not found")}
+        for item_id in ids
+    ]
@@ -0,0 +1,304 @@
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal
+from . import models, schemas
+from .background import BackgroundLoop
+
+# Configuration
+MAX_SUBSCRIBERS = int(os.getenv("CHANGE_FEED_MAX_SUBSCRIBERS", "200"))  # per worker
+POLL_INTERVAL_SECONDS = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "1"))
+HEARTBEAT_SECONDS = 15
+RETENTION_HOURS = 24
+SUBSCRIBER_QUEUE_SIZE = 1000  # slower clients are disconnected and resume by event id
+FETCH_BATCH_SIZE = 500
+BACKLOG_LIMIT = 5000  # clients further behind than this reload instead of replaying
+# Ids are assigned at insert but become visible at commit, so concurrent
+# transactions can commit out of order; re-read this many ids back
+REORDER_WINDOW = 100
+# EventSource cannot send headers, so streams are opened with a single-use
+# ticket instead of the access token, which would end up in access logs
+TICKET_TTL_SECONDS = 30
+
+
+
+def make_event(content_type: str, content_id: int, action: str, status: Optional[str],
+               previous_status: Optional[str], updated_at: Optional[datetime]) -> dict:
+    return {
+        "content_type": content_type,
+        "content_id": content_id,
+        "action": action,
+        "status": status,
+        "previous_status": previous_status,
+        "updated_at": updated_at,
+    }
+
+
+def record(db: Session, events: List[dict]) -> None:
+    """Append change events in the writer's transaction (for set-based writes)."""
+    if not events:
+        return
+    db.connection().execute(insert(models.ChangeEvent), events)
+    db.info["changes_dirty"] = True
+    # Published content was added, edited or withdrawn; see export.schedule_export
+    if any("published" in (event["status"], event["previous_status"]) for event in events):
+        db.info["published_changed"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed(session: Session, flush_context):
+    events = []
+    for obj in session.new:
+        content_type = models.TABLE_CONTENT_TYPES.get(getattr(obj, "__tablename__", None))
+        if content_type:
+            events.append(make_event(content_type, obj.id, "created", obj.status, None, obj.updated_at))
+    for obj in session.dirty:
+        content_type = models.TABLE_CONTENT_TYPES.get(getattr(obj, "__tablename__", None))
+        if content_type and session.is_modified(obj):
+            history = inspect(obj).attrs.status.history
+            previous = history.deleted[0] if history.deleted else obj.status
+            events.append(make_event(content_type, obj.id, "updated", obj.status, previous, obj.updated_at))
+    for obj in session.deleted:
+        content_type = models.TABLE_CONTENT_TYPES.get(getattr(obj, "__tablename__", None))
+        if content_type:
+            events.append(make_event(content_type, obj.id, "deleted", None, obj.status, None))
+    record(session, events)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session: Session):
+    if session.info.pop("changes_dirty", False):
+        feed.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session):
+    session.info.pop("changes_dirty", None)
+    session.info.pop("published_changed", None)
+
+
+def payload(row: models.ChangeEvent) -> dict:
+    return {
+        "type": row.content_type,
+        "id": row.content_id,
+        "action": row.action,
+        "status": row.status,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
+
+
+def visible(event: dict, previous_status: Optional[str], is_admin: bool) -> Optional[dict]:
+    """The event as a subscriber may see it: non-admins only learn about published items."""
+    if is_admin or event["status"] == "published":
+        return event
+    if previous_status == "published":
+        # It left the published catalog; say so without revealing its new state
+        return {"type": event["type"], "id": event["id"], "action": "removed", "status": None, "updated_at": None}
+    return None
+
+
+class Subscriber:
+    def __init__(self, is_admin: bool):
+        self.is_admin = is_admin
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.dropped = False
+
+    def offer(self, item) -> None:
+        if self.dropped:
+            return
+        if self.queue.qsize() >= SUBSCRIBER_QUEUE_SIZE:
+            self.dropped = True
+            item = None
+        self.queue.put_nowait(item)
+
+
+class ChangeFeed(BackgroundLoop):
+    """Polls change_events once per worker and fans new events out to SSE subscribers."""
+
+    name = "Change feed poll"
+
+    def __init__(self):
+        super().__init__(POLL_INTERVAL_SECONDS)
+        self._last_prune = 0.0
+        self.last_id = 0
+        self._delivered = deque(maxlen=REORDER_WINDOW * 2)
+        self.subscribers = set()
+
+    async def start(self):
+        self.last_id = await asyncio.to_thread(latest_id)
+        super().start()
+
+    async def stop(self):
+        await super().stop()
+        for subscriber in list(self.subscribers):
+            subscriber.queue.put_nowait(None)
+
+    def subscribe(self, is_admin: bool) -> Optional[Subscriber]:
+        if len(self.subscribers) >= MAX_SUBSCRIBERS:
+            return None
+        subscriber = Subscriber(is_admin)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    async def step(self) -> bool:
+        if not self.subscribers:
+            return False
+        for row in await asyncio.to_thread(self._fetch_new):
+            for subscriber in list(self.subscribers):
+                subscriber.offer(row)
+        return False
+
+    def _fetch_new(self) -> list:
+        db = SessionLocal()
+        try:
+            delivered = set(self._delivered)
+            rows = []
+            after = max(0, self.last_id - REORDER_WINDOW)
+            while True:
+                batch = db.execute(
+                    select(models.ChangeEvent)
+                    .where(models.ChangeEvent.id > after)
+                    .order_by(models.ChangeEvent.id)
+                    .limit(FETCH_BATCH_SIZE)
+                ).scalars().all()
+                rows += [row for row in batch if row.id > self.last_id or row.id not in delivered]
+                if len(batch) < FETCH_BATCH_SIZE:
+                    break
+                after = batch[-1].id
+            for row in rows:
+                self._delivered.append(row.id)
+                self.last_id = max(self.last_id, row.id)
+
+            if time.monotonic() - self._last_prune > 600:
+                self._last_prune = time.monotonic()
+                cutoff = datetime.utcnow() - timedelta(hours=RETENTION_HOURS)
+                db.execute(delete(models.ChangeEvent).where(models.ChangeEvent.created_at < cutoff))
+                db.commit()
+            return [(row.id, payload(row), row.previous_status) for row in rows]
+        finally:
+            db.close()
+
+
+def latest_id() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(func.max(models.ChangeEvent.id)).scalar() or 0
+    finally:
+        db.close()
+
+
+def backlog(since_id: int) -> Optional[list]:
+    """Events after ``since_id``, or None when some were pruned or there are too many."""
+    db = SessionLocal()
+    try:
+        oldest = db.query(func.min(models.ChangeEvent.id)).scalar()
+        if oldest is not None and since_id < oldest - 1:
+            return None
+        rows = db.execute(
+            select(models.ChangeEvent)
+            .where(models.ChangeEvent.id > since_id)
+            .order_by(models.ChangeEvent.id)
+            .limit(BACKLOG_LIMIT + 1)
+        ).scalars().all()
+        if len(rows) > BACKLOG_LIMIT:
+            return None
+        return [(row.id, payload(row), row.previous_status) for row in rows]
+    finally:
+        db.close()
+
+
+def _ticket_hash(ticket: str) -> str:
+    return hashlib.sha256(ticket.encode()).hexdigest()
+
+
+def issue_ticket(db: Session, user: schemas.CurrentUser) -> str:
+    """A ticket that opens one stream for ``user`` within TICKET_TTL_SECONDS. The caller commits."""
+    now = datetime.utcnow()
+    ticket = secrets.token_urlsafe(32)
+    db.execute(delete(models.ChangeStreamTicket).where(models.ChangeStreamTicket.expires_at < now))
+    db.add(models.ChangeStreamTicket(
+        ticket_hash=_ticket_hash(ticket),
+        user_id=user.id,
+        is_admin=user.is_admin,
+        expires_at=now + timedelta(seconds=TICKET_TTL_SECONDS),
+    ))
+    return ticket
+
+
+def redeem_ticket(ticket: str) -> Optional[bool]:
+    """Use up ``ticket``. Returns whether its holder is an admin, or None if it is unknown, used or expired."""
+    tickets = models.ChangeStreamTicket
+    db = SessionLocal()
+    try:
+        valid = (tickets.ticket_hash == _ticket_hash(ticket), tickets.expires_at >= datetime.utcnow())
+        is_admin = db.execute(select(tickets.is_admin).where(*valid)).scalar()
+        # Only the request whose delete removes the row gets the stream
+        if is_admin is None or db.execute(delete(tickets).where(*valid)).rowcount != 1:
+            db.rollback()
+            return None
+        db.commit()
+        return is_admin
+    finally:
+        db.close()
+
+
+def _format(event_id: int, event: dict) -> str:
+    return f"id: {event_id}\nevent: change\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream(subscriber: Subscriber, since_id: Optional[int]):
+    """SSE text for one subscriber: missed events after ``since_id``, then live ones.
+
+    The subscriber is registered before the backlog is read, so nothing
+    committed in between is lost; events already sent are skipped.
+    """
+    try:
+        yield f"retry: {int(POLL_INTERVAL_SECONDS * 3000)}\n\n"
+        missed = [] if since_id is None else await asyncio.to_thread(backlog, since_id)
+        if since_id is None or missed is None:
+            since_id = await asyncio.to_thread(latest_id)
+        if missed is None:
+            # Too far behind to replay; the client reloads its lists
+            yield f"id: {since_id}\nevent: reset\ndata: {{}}\n\n"
+            missed = []
+        sent = deque(maxlen=REORDER_WINDOW * 2)
+        for event_id, event, previous_status in missed:
+            sent.append(event_id)
+            event = visible(event, previous_status, subscriber.is_admin)
+            if event:
+                yield _format(event_id, event)
+
+        while True:
+            try:
+                item = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if item is None:
+                # Dropped for falling behind, or shutting down; the client reconnects
+                return
+            event_id, event, previous_status = item
+            if event_id <= since_id or event_id in sent:
+                continue
+            sent.append(event_id)
+            event = visible(event, previous_status, subscriber.is_admin)
+            if event:
+                yield _format(event_id, event)
+    finally:
+        feed.unsubscribe(subscriber)
+
+
+feed = ChangeFeed()
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from . import auth, invalidation, models
+from .db import wrote_recently
+from .profiling import PROFILE_HEADER
+
+# Configuration
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "1") == "1"
+# How long a finished response is reused; writes in any worker drop it sooner
+CACHE_TTL_SECONDS = float(os.getenv("COALESCE_CACHE_TTL", "2"))
+MAX_CACHED_RESPONSES = 2000
+
+# Read routes whose responses depend only on path, query and the caller's role
+COALESCED_PREFIXES = {
+    f"/api/{content_type}/": content_type for content_type in models.CONTENT_MODELS
+}
+
+Key = Tuple[str, str, str, bool]
+Entry = Tuple[int, list, bytes]
+
+# Requests this worker served, by how: "cached", "coalesced" or "fetched"
+counts = Counter()
+
+
+class ResponseCache:
+    """Finished read responses, kept CACHE_TTL_SECONDS or until their content type changes."""
+
+    def __init__(self, max_entries: int = MAX_CACHED_RESPONSES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Key, Tuple[float, Entry]]" = OrderedDict()
+        # Bumped on every write, so a query that started before it is never stored
+        self._generations: Dict[str, int] = Counter()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def generation(self, content_type: str) -> int:
+        return self._generations[content_type]
+
+    def get(self, key: Key) -> Optional[Entry]:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                return None
+            if cached[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return cached[1]
+
+    def put(self, key: Key, entry: Entry, generation: int) -> None:
+        with self._lock:
+            if self._generations[key[0]] != generation:
+                return
+            self._entries[key] = (time.monotonic() + CACHE_TTL_SECONDS, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, table: str) -> None:
+        content_type = table.removeprefix("archived_")
+        # Responses embed authors, so a users write drops everything
+        content_types = list(COALESCED_PREFIXES.values()) if table == "users" else [content_type]
+        with self._lock:
+            for content_type in content_types:
+                self._generations[content_type] += 1
+            for key in [key for key in self._entries if key[0] in content_types]:
+                del self._entries[key]
+
+
+cache = ResponseCache()
+for _content_type in models.CONTENT_MODELS:
+    invalidation.subscribe(_content_type, cache.invalidate)
+    invalidation.subscribe(f"archived_{_content_type}", cache.invalidate)
+invalidation.subscribe("users", cache.invalidate)
+
+
+def _content_type(request: Request) -> Optional[str]:
+    for prefix, content_type in COALESCED_PREFIXES.items():
+        if request.url.path.startswith(prefix):
+            return content_type
+    return None
+
+
+async def _is_admin(request: Request) -> Optional[bool]:
+    """The caller's role, or None when the token would be rejected (the route answers that)."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return (await auth.get_current_user(token)).is_admin
+    except HTTPException:
+        return None
+
+
+def _response(entry: Entry) -> Response:
+    status_code, headers, body = entry
+    response = Response(body, status_code=status_code)
+    response.raw_headers = list(headers)
+    return response
+
+
+class CoalesceMiddleware(BaseHTTPMiddleware):
+    """Serve identical concurrent content reads from one database query.
+
+    GETs with the same path, query string and role wait for the first one's
+    response instead of running their own, and 200 responses are reused for
+    CACHE_TTL_SECONDS. Writes to the content, archive or users tables drop
+    the affected responses in every worker via the invalidation bus.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._in_flight: Dict[Key, asyncio.Future] = {}
+
+    async def dispatch(self, request: Request, call_next):
+        content_type = _content_type(request) if COALESCE_ENABLED else None
+        if (
+            content_type is None
+            or request.method != "GET"
+            or request.headers.get(PROFILE_HEADER)
+            # Clients that just wrote read their own writes from the primary
+            or wrote_recently(request)
+        ):
+            return await call_next(request)
+        is_admin = await _is_admin(request)
+        if is_admin is None:
+            return await call_next(request)
+
+        key = (content_type, request.url.path, str(request.query_params), is_admin)
+        entry = cache.get(key)
+        if entry is not None:
+            counts["cached"] += 1
+            return _response(entry)
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            entry = await asyncio.shield(in_flight)
+            if entry is not None:
+                counts["coalesced"] += 1
+                return _response(entry)
+            # The first request failed; this one runs on its own
+            return await call_next(request)
+
+        counts["fetched"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        generation = cache.generation(content_type)
+        try:
+            response = await call_next(request)
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            entry = (response.status_code, response.raw_headers, body)
+            if response.status_code == 200:
+                cache.put(key, entry, generation)
+            future.set_result(entry)
+            return _response(entry)
+        finally:
+            if not future.done():
+                future.set_result(None)
+            del self._in_flight[key]
@@ -1,27 +1,98 @@
+import math
 import os
-from sqlalchemy import create_engine
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from . import deadlines
+
+
+def _normalize(url: str) -> str:
+    # Normalize deprecated postgres:// to postgresql:// for SQLAlchemy
+    return url.replace("postgres://", "postgresql://", 1)
+
+
+def _create_engine(url: str):
+    return create_engine(
+        url,
+        connect_args={"check_same_thread": False} if url.startswith("sqlite") else {},
+    )
+
 
 raw_url = os.getenv("DATABASE_URL", "sqlite:///./app.db")
-# Normalize deprecated postgres:// to postgresql:// for SQLAlchemy
-DATABASE_URL = raw_url.replace("postgres://", "postgresql://", 1)
+DATABASE_URL = _normalize(raw_url)
+
+# Optional replica for read-only routes; reads go to the primary when unset
+raw_read_url = os.getenv("DATABASE_READ_URL")
+DATABASE_READ_URL = _normalize(raw_read_url) if raw_read_url else None
+
+# After a client writes, its reads stay on the primary this long to hide replica lag
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# Set on write responses for READ_YOUR_WRITES_SECONDS. The client carries it,
+# so every worker sees it, and faking it only moves the caller's own reads
+WROTE_COOKIE = "last_write"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
-)
+engine = _create_engine(DATABASE_URL)
+read_engine = _create_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
 
-def get_db():
+def wrote_recently(request: Request) -> bool:
+    """Whether this client's reads must see the primary to observe its own writes"""
+    return bool(DATABASE_READ_URL) and WROTE_COOKIE in request.cookies
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _remember_writer(session):
+    response = session.info.get("response")
+    if response is None or not DATABASE_READ_URL:
+        return
+    response.set_cookie(
+        WROTE_COOKIE, "1", max_age=math.ceil(READ_YOUR_WRITES_SECONDS), httponly=True, samesite="lax"
+    )
+
+
+def get_db(request: Request, response: Response):
     db = SessionLocal()
+    # Routes return models, so cookies set here are merged into their response
+    db.info["response"] = response
+    db.info["deadline"] = deadlines.current()
     try:
         yield db
     finally:
         db.close()
 
 
+if DATABASE_READ_URL:
+    def get_read_db(request: Request):
+        """Session for read-only routes, on the replica unless the client just wrote"""
+        db = SessionLocal() if wrote_recently(request) else ReadSessionLocal()
+        db.info["deadline"] = deadlines.current()
+        try:
+            yield db
+        finally:
+            db.close()
+else:
+    # Without a replica, reads share the request's primary session
+    get_read_db = get_db
+
+
+def upsert(connection, model, rows: list, update, where=None) -> None:
+    """Insert ``rows`` into ``model``'s table in one statement, updating rows whose key exists.
+
+    ``update`` (and ``where``) get the incoming row as ``excluded`` and return
+    the values to set (and the condition for setting them).
+    """
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[column.name for column in model.__table__.primary_key],
+        set_=update(stmt.excluded),
+        where=where(stmt.excluded) if where else None,
+    )
+    connection.execute(stmt, rows)
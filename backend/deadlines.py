@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from fastapi.routing import iter_route_contexts
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+# Configuration
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "10"))
+# Long-lived endpoints that must not inherit a request deadline
+EXEMPT_PATHS = {"/api/changes", "/api/changes/"}
+# SQLite calls the progress handler every this many VM instructions
+SQLITE_PROGRESS_STEPS = 1000
+POSTGRES_QUERY_CANCELED = "57014"
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+# Timeouts seen by this worker, by route
+timeouts = Counter()
+# Full path templates by id() of the app's routes; nested routers only know their own part
+_route_paths: Dict[int, str] = {}
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def current() -> Optional[float]:
+    """time.monotonic() by which the current request must finish, if any."""
+    return _deadline.get()
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session: Session, transaction, connection):
+    deadline = session.info.get("deadline")
+    if deadline is None:
+        return
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded()
+    if connection.dialect.name == "postgresql":
+        # SET LOCAL lasts until the end of this transaction
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}")
+    elif connection.dialect.name == "sqlite":
+        connection.connection.driver_connection.set_progress_handler(
+            lambda: 1 if time.monotonic() > deadline else 0, SQLITE_PROGRESS_STEPS
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_deadline(session: Session):
+    # The write is saved; reloading the result must not turn it into a 503
+    session.info.pop("deadline", None)
+
+
+@event.listens_for(Pool, "checkin")
+def _clear_progress_handler(dbapi_connection, connection_record):
+    # The next request to check this connection out has its own deadline
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.set_progress_handler(None, 0)
+
+
+def is_timeout(exc: Exception) -> bool:
+    if isinstance(exc, DeadlineExceeded):
+        return True
+    if isinstance(exc, OperationalError):
+        orig = exc.orig
+        if isinstance(orig, sqlite3.OperationalError):
+            return str(orig) == "interrupted"
+        return getattr(orig, "pgcode", None) == POSTGRES_QUERY_CANCELED
+    return False
+
+
+def _route_path(request: Request) -> str:
+    route = request.scope.get("route")
+    if route is None:
+        return request.url.path
+    if id(route) not in _route_paths:
+        for context in iter_route_contexts(request.app.routes):
+            _route_paths.setdefault(id(context.original_route), context.path)
+    return _route_paths.get(id(route), request.url.path)
+
+
+def timeout_response(request: Request) -> JSONResponse:
+    timeouts[_route_path(request)] += 1
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Request took too long"},
+        headers={"Retry-After": "1"},
+    )
+
+
+class DeadlineMiddleware:
+    """Give each API request a deadline that its database sessions enforce.
+
+    A plain ASGI middleware: it only sets a ContextVar, which the route and
+    its threadpool dependencies inherit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        path = scope["path"] if scope["type"] == "http" else ""
+        if not path.startswith("/api/") or path in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        token = _deadline.set(time.monotonic() + REQUEST_TIMEOUT_SECONDS)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _deadline.reset(token)
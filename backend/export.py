@@ -0,0 +1,282 @@
+import argparse
+import fcntl
+import gzip
+import html
+import json
+import os
+import re
+import time
+from typing import Dict, List
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal, engine, Base
+from . import models, sections, tasks
+from .tasks import LINK_PATTERN
+
+# Optional directory the job queue keeps exported after every change to published content
+EXPORT_DIR = os.getenv("EXPORT_DIR")
+EXPORT_HTML = os.getenv("EXPORT_HTML", "0") == "1"
+
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+MANIFEST_VERSION = 1
+# Changed items have their content loaded this many at a time
+CONTENT_BATCH_SIZE = 200
+# Slugs become file names; older rows may predate the schema check
+SAFE_SLUG = re.compile(r"^[a-zA-Z0-9_-]+$")
+
+SUMMARY_FIELDS = (
+    "id", "slug", "title", "description", "difficulty", "tags", "status",
+    "author_id", "created_at", "updated_at", "published_at",
+)
+
+
+def _jsonable(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _write(path: str, data: bytes) -> bool:
+    """Write ``data`` and a precompressed ``.gz`` beside it, unless unchanged."""
+    try:
+        with open(path, "rb") as existing:
+            if existing.read() == data and os.path.exists(path + ".gz"):
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # mtime=0 keeps the .gz identical across runs for identical content
+    for target, payload in ((path, data), (path + ".gz", gzip.compress(data, 9, mtime=0))):
+        tmp = target + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, target)
+    return True
+
+
+def _remove(path: str) -> None:
+    for target in (path, path + ".gz"):
+        try:
+            os.remove(target)
+        except FileNotFoundError:
+            pass
+
+
+def _json_bytes(payload) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _link_html(match) -> str:
+    target_type, slug, title = match.groups()
+    return f'<a class="content-link {target_type}" href="../{target_type}s/{slug}.html">{html.escape(title or slug)}</a>'
+
+
+def render_html(item: dict) -> bytes:
+    """Plain HTML page for one item: MDX split into its heading sections.
+
+    Section bodies are kept as preformatted MDX with content links turned
+    into relative anchors; the interactive frontend does the full rendering.
+    """
+    mdx = item["content_mdx"]
+    body = []
+    for section in sections.parse_sections(mdx):
+        text = mdx[section["start_offset"]:section["end_offset"]]
+        if section["level"]:
+            _, _, text = text.partition("\n")
+            level = section["level"] + 1  # the page title is the h1
+            body.append(f'<h{level} id="{section["anchor"]}">{html.escape(section["title"])}</h{level}>')
+        if text.strip():
+            parts = []
+            last = 0
+            for match in LINK_PATTERN.finditer(text):
+                parts.append(html.escape(text[last:match.start()]))
+                parts.append(_link_html(match))
+                last = match.end()
+            parts.append(html.escape(text[last:]))
+            body.append(f'<pre class="mdx">{"".join(parts).strip()}</pre>')
+    page = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(item["title"])}</title>
+<meta name="description" content="{html.escape(item["description"])}">
+</head>
+<body>
+<article>
+<h1>{html.escape(item["title"])}</h1>
+<p class="meta">{html.escape(item["difficulty"])} &middot; {html.escape(item["tags"])} &middot; by {html.escape(item["author"]["username"])}</p>
+{chr(10).join(body)}
+</article>
+</body>
+</html>
+"""
+    return page.encode()
+
+
+def render_index_html(content_type: str, items: List[dict]) -> bytes:
+    rows = "\n".join(
+        f'<li><a href="{html.escape(item["slug"])}.html">{html.escape(item["title"])}</a> '
+        f'<span class="difficulty">{html.escape(item["difficulty"])}</span></li>'
+        for item in items
+    )
+    title = content_type.capitalize()
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+</head>
+<body>
+<h1>{title}</h1>
+<ul>
+{rows}
+</ul>
+</body>
+</html>
+""".encode()
+
+
+def _load_manifest(outdir: str) -> dict:
+    try:
+        with open(os.path.join(outdir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return manifest if manifest.get("version") == MANIFEST_VERSION else {}
+
+
+def _published_summaries(db: Session, model) -> List[dict]:
+    columns = [getattr(model, field) for field in SUMMARY_FIELDS]
+    rows = db.execute(
+        select(*columns, models.User.username)
+        .join(models.User, model.author_id == models.User.id)
+        .where(model.status == "published")
+        .order_by(model.created_at.desc())
+    ).all()
+    summaries = []
+    for row in rows:
+        summary = {field: _jsonable(value) for field, value in zip(SUMMARY_FIELDS, row)}
+        summary["author"] = {"id": row.author_id, "username": row.username}
+        summaries.append(summary)
+    return summaries
+
+
+def export(db: Session, outdir: str, include_html: bool = False, full: bool = False) -> Dict[str, int]:
+    """Render the published catalog into ``outdir`` as static files.
+
+    Writes ``<type>/<slug>.json`` per item and ``<type>/index.json`` per content
+    type, each with a gzip copy (and ``.html`` pages when ``include_html``).
+    Items whose ``updated_at`` matches the previous run's manifest are not
+    re-rendered; files of items no longer published are removed. Items whose
+    slug is not a safe file name are skipped.
+    """
+    started = time.monotonic()
+    previous = _load_manifest(outdir)
+    old_items = previous.get("items", {})
+    rebuild = full or previous.get("html", include_html) != include_html
+    new_items = {}
+    counts = {"written": 0, "skipped": 0, "removed": 0}
+    catalog = {}
+
+    for content_type, model in models.CONTENT_MODELS.items():
+        summaries = _published_summaries(db, model)
+        changed = []
+        unsafe = [summary for summary in summaries if not SAFE_SLUG.match(summary["slug"])]
+        for summary in unsafe:
+            print(f"Not exporting {content_type} {summary['id']}: unsafe slug {summary['slug']!r}")
+        summaries = [summary for summary in summaries if SAFE_SLUG.match(summary["slug"])]
+        for summary in summaries:
+            key = f"{content_type}/{summary['id']}"
+            entry = {"slug": summary["slug"], "updated_at": summary["updated_at"]}
+            new_items[key] = entry
+            path = os.path.join(outdir, content_type, f"{summary['slug']}.json")
+            if not rebuild and old_items.get(key) == entry and os.path.exists(path):
+                counts["skipped"] += 1
+            else:
+                changed.append(summary)
+
+        for start in range(0, len(changed), CONTENT_BATCH_SIZE):
+            batch = {summary["id"]: summary for summary in changed[start:start + CONTENT_BATCH_SIZE]}
+            contents = db.execute(select(model.id, model.content_mdx).where(model.id.in_(list(batch)))).all()
+            for item_id, content_mdx in contents:
+                item = dict(batch[item_id], content_mdx=content_mdx)
+                base = os.path.join(outdir, content_type, item["slug"])
+                _write(base + ".json", _json_bytes(item))
+                if include_html:
+                    _write(base + ".html", render_html(item))
+                counts["written"] += 1
+
+        index_path = os.path.join(outdir, content_type, "index")
+        _write(index_path + ".json", _json_bytes(summaries))
+        if include_html:
+            _write(index_path + ".html", render_index_html(content_type, summaries))
+        catalog[content_type] = {"count": len(summaries), "index": f"{content_type}/index.json"}
+
+    # Unpublished, deleted or renamed items
+    live = {(key.split("/", 1)[0], entry["slug"]) for key, entry in new_items.items()}
+    for key, entry in old_items.items():
+        content_type = key.split("/", 1)[0]
+        if not SAFE_SLUG.match(entry["slug"]):
+            continue
+        if (content_type, entry["slug"]) not in live:
+            for extension in ("json", "html"):
+                _remove(os.path.join(outdir, content_type, f"{entry['slug']}.{extension}"))
+            counts["removed"] += 1
+        elif previous.get("html") and not include_html:
+            _remove(os.path.join(outdir, content_type, f"{entry['slug']}.html"))
+    if previous.get("html") and not include_html:
+        for content_type in models.CONTENT_MODELS:
+            _remove(os.path.join(outdir, content_type, "index.html"))
+
+    _write(os.path.join(outdir, "index.json"), _json_bytes(catalog))
+    manifest = {"version": MANIFEST_VERSION, "html": include_html, "items": new_items}
+    with open(os.path.join(outdir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    counts["seconds"] = round(time.monotonic() - started, 3)
+    return counts
+
+
+def export_catalog(db: Session, job: models.OutboxJob):
+    """Bring EXPORT_DIR up to date; one run covers every change committed before it."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    with open(os.path.join(EXPORT_DIR, LOCK_FILE), "w") as lock:
+        # Workers take turns, so the manifest is never written by two at once
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        counts = export(db, EXPORT_DIR, include_html=EXPORT_HTML)
+    print(f"Exported catalog to {EXPORT_DIR}: {counts}")
+
+
+def schedule_export(session: Session):
+    """Queue an export with any transaction that publishes, edits, unpublishes,
+    archives or deletes published content."""
+    # Record this transaction's remaining ORM changes first
+    session.flush()
+    if session.info.pop("published_changed", False):
+        # A pending export job is not duplicated, so a bulk write exports once
+        tasks.enqueue(session, "export", "catalog", 0)
+
+
+if EXPORT_DIR:
+    event.listen(Session, "before_commit", schedule_export)
+    tasks.register("export")(export_catalog)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.export",
+        description="Export the published catalog as precompressed static files",
+    )
+    parser.add_argument("outdir", help="directory to write into, reused across runs")
+    parser.add_argument("--html", action="store_true", help="also render HTML pages")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-render everything")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    os.makedirs(args.outdir, exist_ok=True)
+    db = SessionLocal()
+    try:
+        counts = export(db, args.outdir, include_html=args.html, full=args.full)
+    finally:
+        db.close()
+    print(f"Exported catalog to {args.outdir}: {counts}")
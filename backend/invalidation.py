@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .db import SessionLocal, engine, DATABASE_URL
+from . import models
+
+# Configuration
+# How stale another worker's view of a table may be before a request re-checks
+CHECK_INTERVAL_SECONDS = float(os.getenv("INVALIDATION_CHECK_INTERVAL", "0.5"))
+NOTIFY_CHANNEL = "table_versions"
+
+# Tables whose writes are broadcast to every worker
+TRACKED_TABLES = {
+    "users", "concepts", "implementations", "problems",
+    "archived_concepts", "archived_implementations", "archived_problems",
+}
+
+Subscriber = Callable[[str], None]
+_subscribers: Dict[str, List[Subscriber]] = defaultdict(list)
+_versions: Dict[str, int] = {}
+_last_checked = 0.0
+_lock = threading.Lock()
+
+
+def subscribe(table: str, callback: Subscriber) -> None:
+    """Call ``callback(table)`` whenever ``table`` changes in any worker.
+
+    Callbacks may run on any thread and must be cheap and thread-safe.
+    """
+    _subscribers[table].append(callback)
+
+
+def _notify(tables) -> None:
+    for table in tables:
+        for callback in _subscribers.get(table, ()):
+            try:
+                callback(table)
+            except Exception as e:
+                print(f"Invalidation callback for {table} failed: {e}")
+
+
+def ensure_rows(db: Session) -> None:
+    existing = {row[0] for row in db.execute(select(models.TableVersion.table_name))}
+    for table in TRACKED_TABLES - existing:
+        db.add(models.TableVersion(table_name=table, version=0))
+    db.commit()
+
+
+def due() -> bool:
+    """Claim the next version check if CHECK_INTERVAL_SECONDS has passed."""
+    global _last_checked
+    now = time.monotonic()
+    with _lock:
+        if now - _last_checked < CHECK_INTERVAL_SECONDS:
+            return False
+        _last_checked = now
+    return True
+
+
+def check(db: Session) -> None:
+    """Compare table versions with the last ones seen and notify on change."""
+    rows = db.execute(select(models.TableVersion.table_name, models.TableVersion.version)).all()
+    changed = []
+    with _lock:
+        for table, version in rows:
+            if _versions.get(table) != version:
+                if table in _versions:
+                    changed.append(table)
+                _versions[table] = version
+    _notify(changed)
+
+
+def check_now() -> None:
+    db = SessionLocal()
+    try:
+        check(db)
+    finally:
+        db.close()
+
+
+class TableVersionMiddleware:
+    """Pick up writes made by other workers before serving from local caches.
+
+    A plain ASGI middleware; between checks it only compares a timestamp.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and due():
+            await run_in_threadpool(check_now)
+        await self.app(scope, receive, send)
+
+
+def _changed_tables(session: Session) -> set:
+    return session.info.setdefault("changed_tables", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session: Session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table in TRACKED_TABLES:
+            _changed_tables(session).add(table)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and table.name in TRACKED_TABLES:
+            _changed_tables(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_versions(session: Session):
+    # Flush first so this commit's pending changes are collected too
+    session.flush()
+    tables = session.info.get("changed_tables")
+    if not tables:
+        return
+    session.execute(
+        update(models.TableVersion)
+        .where(models.TableVersion.table_name.in_(sorted(tables)))
+        .values(version=models.TableVersion.version + 1)
+    )
+    if DATABASE_URL.startswith("postgresql"):
+        for table in sorted(tables):
+            session.execute(select(func.pg_notify(NOTIFY_CHANNEL, table)))
+    session.info["committed_tables"] = session.info.pop("changed_tables")
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_local(session: Session):
+    # This worker need not wait for the next check to see its own writes
+    _notify(session.info.pop("committed_tables", ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session):
+    session.info.pop("changed_tables", None)
+    session.info.pop("committed_tables", None)
+
+
+def _listen_postgres(stop: threading.Event) -> None:
+    """Block on LISTEN and re-check versions as soon as another worker writes."""
+    import select as io_select
+
+    while not stop.is_set():
+        try:
+            raw = engine.raw_connection()
+            # Keep the autocommit LISTEN connection out of the pool
+            raw.detach()
+            try:
+                conn = raw.driver_connection
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+                while not stop.is_set():
+                    if io_select.select([conn], [], [], 5.0)[0]:
+                        conn.poll()
+                        if conn.notifies:
+                            conn.notifies.clear()
+                            check_now()
+            finally:
+                raw.close()
+        except Exception as e:
+            print(f"Invalidation listener error, reconnecting: {e}")
+            stop.wait(1.0)
+
+
+_listener_stop = threading.Event()
+
+
+def start() -> None:
+    db = SessionLocal()
+    try:
+        ensure_rows(db)
+        check(db)
+    finally:
+        db.close()
+    if DATABASE_URL.startswith("postgresql"):
+        _listener_stop.clear()
+        threading.Thread(target=_listen_postgres, args=(_listener_stop,), daemon=True).start()
+
+
+def stop() -> None:
+    _listener_stop.set()
@@ -0,0 +1,64 @@
+from typing import List
+
+from fastapi import Response
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.orm import Query
+
+from . import models
+
+# Output fields, in the order the *Detail response models emit them
+CONTENT_FIELDS = (
+    "slug", "title", "description", "content_mdx", "difficulty", "tags", "status",
+    "id", "author_id", "created_at", "updated_at", "published_at",
+)
+AUTHOR_FIELDS = ("username", "email", "id", "is_admin", "created_at")
+
+
+def page_rows(query: Query, offset: int, limit: int) -> list:
+    """Run a filtered list query for one page as plain column tuples.
+
+    ``query`` selects a content model (or its archive tier) with its filters
+    applied; only the columns of the *Detail schema are loaded, with the
+    author joined in.
+    """
+    model = query.column_descriptions[0]["entity"]
+    # Sort and page over narrow (id, created_at) rows, then load the wide
+    # columns and author for just that page
+    page = (
+        query.with_entities(model.id, model.created_at)
+        .order_by(model.created_at.desc())
+        .offset(offset)
+        .limit(limit)
+        .subquery()
+    )
+    columns = [getattr(model, field) for field in CONTENT_FIELDS]
+    columns += [getattr(models.User, field) for field in AUTHOR_FIELDS]
+    return query.session.execute(
+        select(*columns)
+        .join(page, model.id == page.c.id)
+        .join(models.User, model.author_id == models.User.id)
+        .order_by(page.c.created_at.desc())
+    ).all()
+
+
+def page_json(rows: list) -> bytes:
+    split = len(CONTENT_FIELDS)
+    items: List[dict] = []
+    for row in rows:
+        item = dict(zip(CONTENT_FIELDS, row[:split]))
+        item["author"] = dict(zip(AUTHOR_FIELDS, row[split:]))
+        items.append(item)
+    # pydantic's encoder, so datetimes are formatted as the response models format them
+    return to_json(items)
+
+
+def page_response(query: Query, offset: int, limit: int, response: Response) -> Response:
+    """JSON list response built from column tuples, skipping ORM objects and pydantic.
+
+    Returns the same body as the route's ``response_model``. Headers already
+    set on the route's injected ``response`` are carried over.
+    """
+    page = Response(page_json(page_rows(query, offset, limit)), media_type="application/json")
+    page.headers.raw.extend(response.headers.raw)
+    return page
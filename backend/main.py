@@ -1,13 +1,53 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import auth, concepts, implementations, problems
-from .db import engine, Base
+from sqlalchemy.exc import OperationalError
+from .routes import admin, auth, changes, concepts, implementations, problems, progress, search
+from .db import engine, Base, SessionLocal
+from .ratelimit import RateLimitMiddleware
+from .profiling import ProfilingMiddleware
+from .deadlines import DeadlineMiddleware, DeadlineExceeded
+from .coalesce import CoalesceMiddleware
+from .tasks import queue
+from .changes import feed
+from .progress import buffer as progress_buffer
+from . import invalidation, stats, sections, deadlines, archive
+# Imported for its export scheduling hooks, registered when EXPORT_DIR is set
+from . import export
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="Comprog Platform API", version="1.0.0")
 
+# Share one query between identical concurrent content reads (innermost, so
+# it runs after the table version check below)
+app.add_middleware(CoalesceMiddleware)
+
+# Pick up writes made by other workers before serving from local caches
+app.add_middleware(invalidation.TableVersionMiddleware)
+
+# Bound each API request's time; its DB sessions apply the deadline as statement timeouts
+app.add_middleware(DeadlineMiddleware)
+
+
+@app.exception_handler(OperationalError)
+async def database_error(request: Request, exc: OperationalError):
+    if deadlines.is_timeout(exc):
+        return deadlines.timeout_response(request)
+    raise exc
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    return deadlines.timeout_response(request)
+
+
+# Rate limit API routes per user or client IP (added first so CORS wraps 429s)
+app.add_middleware(RateLimitMiddleware)
+
+# Profile individual requests on demand for admins (X-Profile header)
+app.add_middleware(ProfilingMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Total-Exact", "X-Profile-Id", "X-Profile-Url"],
 )
 
 # Include routers
@@ -22,6 +63,34 @@ app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(concepts.router, prefix="/api/concepts", tags=["concepts"])
 app.include_router(implementations.router, prefix="/api/implementations", tags=["implementations"])
 app.include_router(problems.router, prefix="/api/problems", tags=["problems"])
+app.include_router(search.router, prefix="/api/search", tags=["search"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.include_router(changes.router, prefix="/api/changes", tags=["changes"])
+app.include_router(progress.router, prefix="/api/progress", tags=["progress"])
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    invalidation.start()
+    db = SessionLocal()
+    try:
+        stats.ensure_initialized(db)
+        sections.ensure_initialized(db)
+        archive.ensure_initialized(db)
+    finally:
+        db.close()
+    queue.start()
+    progress_buffer.start()
+    await feed.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    await feed.stop()
+    # Write buffered progress marks before the worker exits
+    await progress_buffer.stop()
+    await queue.stop()
+    invalidation.stop()
 
 
 @app.get("/")
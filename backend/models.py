@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from .db import Base
 
@@ -10,7 +10,9 @@ class User(Base):
     username = Column(String(50), unique=True, index=True, nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
-    is_admin = Column(Boolean, default=False, nullable=False)
+    is_admin = Column(Boolean, default=False, nullable=False, index=True)
+    token_version = Column(Integer, default=0, nullable=False)  # bumped to revoke issued tokens
+    token_version_changed_at = Column(DateTime, nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
@@ -40,6 +42,9 @@ class Concept(Base):
     # Relationships
     author = relationship("User", back_populates="concepts")
 
+    # Never reuse ids, which archived rows keep while in the archive tier
+    __table_args__ = {"sqlite_autoincrement": True}
+
 
 class Implementation(Base):
     __tablename__ = "implementations"
@@ -62,6 +67,9 @@ class Implementation(Base):
     # Relationships
     author = relationship("User", back_populates="implementations")
 
+    # Never reuse ids, which archived rows keep while in the archive tier
+    __table_args__ = {"sqlite_autoincrement": True}
+
 
 class Problem(Base):
     __tablename__ = "problems"
@@ -84,4 +92,210 @@ class Problem(Base):
     # Relationships
     author = relationship("User", back_populates="problems")
 
+    # Never reuse ids, which archived rows keep while in the archive tier
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+# Archive tier: archived content moves here with its id, keeping the hot tables small
+class ArchivedConcept(Base):
+    __tablename__ = "archived_concepts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    slug = Column(String(255), unique=True, index=True, nullable=False)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, default="", nullable=False)
+    content_mdx = Column(Text, nullable=False)
+    difficulty = Column(String(50), default="beginner", nullable=False)
+    tags = Column(String(500), default="", nullable=False)
+    status = Column(String(50), default="archived", nullable=False)  # always archived
+
+    # Metadata
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    published_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    # Relationships
+    author = relationship("User")
+
+
+class ArchivedImplementation(Base):
+    __tablename__ = "archived_implementations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    slug = Column(String(255), unique=True, index=True, nullable=False)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, default="", nullable=False)
+    content_mdx = Column(Text, nullable=False)
+    difficulty = Column(String(50), default="beginner", nullable=False)
+    tags = Column(String(500), default="", nullable=False)
+    status = Column(String(50), default="archived", nullable=False)  # always archived
+
+    # Metadata
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    published_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    # Relationships
+    author = relationship("User")
+
+
+class ArchivedProblem(Base):
+    __tablename__ = "archived_problems"
+
+    id = Column(Integer, primary_key=True, index=True)
+    slug = Column(String(255), unique=True, index=True, nullable=False)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, default="", nullable=False)
+    content_mdx = Column(Text, nullable=False)
+    difficulty = Column(String(50), default="beginner", nullable=False)
+    tags = Column(String(500), default="", nullable=False)
+    status = Column(String(50), default="archived", nullable=False)  # always archived
+
+    # Metadata
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    published_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    # Relationships
+    author = relationship("User")
+
+
+class OutboxJob(Base):
+    __tablename__ = "outbox_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)  # publish
+    content_type = Column(String(50), nullable=False)  # concepts, implementations, problems
+    content_id = Column(Integer, nullable=False)
+    status = Column(String(50), default="pending", nullable=False, index=True)  # pending, running, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_jobs_dedup", "kind", "content_type", "content_id", "status"),
+    )
+
+
+class ContentLink(Base):
+    __tablename__ = "content_links"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source_type = Column(String(50), nullable=False)
+    source_id = Column(Integer, nullable=False)
+    target_type = Column(String(50), nullable=False)  # concept, implementation, problem
+    target_slug = Column(String(255), nullable=False)
+    title = Column(String(255), default="", nullable=False)
+
+    __table_args__ = (
+        Index("ix_content_links_source", "source_type", "source_id"),
+        Index("ix_content_links_target", "target_type", "target_slug"),
+    )
+
+
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+
+    table_name = Column(String(50), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+
+class ContentStat(Base):
+    __tablename__ = "content_stats"
+
+    content_type = Column(String(50), primary_key=True)  # concepts, implementations, problems
+    facet = Column(String(50), primary_key=True)  # status, difficulty, tags
+    value = Column(String(255), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
+class ContentSection(Base):
+    __tablename__ = "content_sections"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_type = Column(String(50), nullable=False)
+    content_id = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)
+    anchor = Column(String(255), nullable=False)
+    title = Column(String(255), default="", nullable=False)
+    level = Column(Integer, nullable=False)  # heading depth, 0 for text before the first heading
+    start_offset = Column(Integer, nullable=False)  # character offsets into content_mdx
+    end_offset = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_content_sections_item", "content_type", "content_id", "position", unique=True),
+    )
+
+
+class ChangeEvent(Base):
+    __tablename__ = "change_events"
+
+    id = Column(Integer, primary_key=True, index=True)  # the SSE event id clients resume from
+    content_type = Column(String(50), nullable=False)  # concepts, implementations, problems
+    content_id = Column(Integer, nullable=False)
+    action = Column(String(50), nullable=False)  # created, updated, deleted
+    status = Column(String(50), nullable=True)  # None once deleted
+    previous_status = Column(String(50), nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    # Event ids must only grow, even after old events are pruned
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class ChangeStreamTicket(Base):
+    __tablename__ = "change_stream_tickets"
+
+    ticket_hash = Column(String(64), primary_key=True)  # sha256 of the ticket; the ticket itself is never stored
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    is_admin = Column(Boolean, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class RequestProfile(Base):
+    __tablename__ = "request_profiles"
+
+    id = Column(String(32), primary_key=True)  # returned in X-Profile-Id
+    filename = Column(String(50), nullable=False)  # profile.folded or profile.prof
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class Progress(Base):
+    __tablename__ = "progress"
+
+    # The key doubles as the index for reading one user's progress
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    content_type = Column(String(50), primary_key=True)  # concepts, implementations, problems
+    content_id = Column(Integer, primary_key=True)
+    status = Column(String(50), nullable=False)  # started, completed
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+
+# Content tables by name, as used by background jobs and other subsystems
+CONTENT_MODELS = {
+    "concepts": Concept,
+    "implementations": Implementation,
+    "problems": Problem,
+}
+
+# Content type of each hot table, for flush hooks that only see ORM objects
+TABLE_CONTENT_TYPES = {model.__tablename__: name for name, model in CONTENT_MODELS.items()}
 
+# Archive tier of each content table, same keys as CONTENT_MODELS
+ARCHIVE_MODELS = {
+    "concepts": ArchivedConcept,
+    "implementations": ArchivedImplementation,
+    "problems": ArchivedProblem,
+}
@@ -0,0 +1,59 @@
+import json
+from typing import Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session
+
+from . import stats
+
+# Totals up to this size are counted exactly; larger ones are looked up or estimated
+EXACT_COUNT_LIMIT = 10000
+
+
+def _planner_estimate(db: Session, query: Query) -> Optional[int]:
+    """Row estimate from the Postgres planner, without running the query."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    compiled = query.statement.compile(dialect=bind.dialect)
+    result = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    plan = json.loads(result) if isinstance(result, str) else result
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def total_count(db: Session, query: Query, content_type: str, status: Optional[str] = None,
+                difficulty: Optional[str] = None, other_filters: bool = False) -> Tuple[int, bool]:
+    """Total rows matched by a list query, and whether that total is exact.
+
+    ``query`` must select the content model (or its archive tier) with its
+    filters applied.
+    ``status`` and ``difficulty`` are the effective equality filters, and
+    ``other_filters`` says whether anything else (search, tags) narrows it.
+    """
+    model = query.column_descriptions[0]["entity"]  # the content model or its archive tier
+    # Count over the primary key only, and stop as soon as the total is known to be large
+    capped = query.with_entities(model.id).order_by(None).limit(EXACT_COUNT_LIMIT + 1).subquery()
+    counted = db.query(func.count()).select_from(capped).scalar()
+    if counted <= EXACT_COUNT_LIMIT:
+        return counted, True
+
+    # The maintained counters answer exactly when at most one facet filter applies
+    if not other_filters and not (status and difficulty):
+        facets = stats.get_stats(db)[content_type]
+        # The counters include the archive tier, which unfiltered lists leave out
+        archived = facets["status"].get("archived", 0)
+        if status:
+            return facets["status"].get(status, 0), True
+        if difficulty and not archived:
+            return facets["difficulty"].get(difficulty, 0), True
+        if not difficulty:
+            return facets["total"] - archived, True
+
+    estimate = _planner_estimate(db, query.with_entities(model.id).order_by(None))
+    return max(counted, estimate or 0), False
+
+
+def set_total_headers(response: Response, total: int, exact: bool) -> None:
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Total-Exact"] = "true" if exact else "false"
@@ -0,0 +1,163 @@
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from .db import SessionLocal
+from . import auth, models
+
+# Configuration
+PROFILE_HEADER = "x-profile"  # "sample" (default) or "cprofile"
+PROFILE_HEADER_BYTES = PROFILE_HEADER.encode()
+SAMPLE_INTERVAL_SECONDS = 0.001
+MAX_STORED_PROFILES = 20
+
+# Innermost frames from these files mean the thread is parked, not working
+IDLE_FILES = ("threading.py", "thread.py", "queue.py", "selectors.py", "base_events.py")
+
+class StackSampler:
+    """Samples every thread's stack at a fixed interval into folded-stack counts.
+
+    Sync routes run in a threadpool, so all threads are sampled; stacks
+    parked in idle waits are skipped. Output is the folded format read by
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.counts[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def folded(self) -> bytes:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common()).encode()
+
+
+def _store(profile_id: str, filename: str, data: bytes) -> None:
+    """Save a profile where every worker can serve it, keeping the newest MAX_STORED_PROFILES."""
+    db = SessionLocal()
+    try:
+        db.add(models.RequestProfile(id=profile_id, filename=filename, data=data))
+        db.flush()
+        keep = select(models.RequestProfile.id).order_by(models.RequestProfile.created_at.desc()).limit(MAX_STORED_PROFILES)
+        db.execute(delete(models.RequestProfile).where(models.RequestProfile.id.not_in(keep)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_profile(db: Session, profile_id: str) -> Optional[Tuple[str, bytes]]:
+    profile = db.get(models.RequestProfile, profile_id)
+    return (profile.filename, profile.data) if profile else None
+
+
+async def _is_admin(request: Request) -> bool:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        token_data = auth.verify_token(token, HTTPException(status_code=401))
+    except HTTPException:
+        return False
+    return token_data.is_admin and await auth.token_is_current(token_data)
+
+
+class ProfilingMiddleware:
+    """Profile a single request when an admin sends the X-Profile header.
+
+    A plain ASGI middleware: requests without the header are passed straight
+    to the app after one scan of the request headers. The profile is stored
+    in the database, so the X-Profile-Url it returns works on any worker.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        mode = None
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER_BYTES:
+                    mode = value.decode("latin-1")
+                    break
+        if not mode or not await _is_admin(Request(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        last_body = []
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode()),
+                    (b"x-profile-url", f"/api/admin/profiles/{profile_id}".encode()),
+                ]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Hold the end of the response until the profile can be downloaded
+                last_body.append(message)
+                return
+            await send(message)
+
+        if mode == "cprofile":
+            # Deterministic, but only sees the event loop thread; sync routes
+            # run in the threadpool and need the sampler
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_profile)
+            finally:
+                profiler.disable()
+            profiler.create_stats()
+            filename, data = "profile.prof", marshal.dumps(profiler.stats)
+        else:
+            sampler = StackSampler()
+            sampler.start()
+            try:
+                await self.app(scope, receive, send_with_profile)
+            finally:
+                sampler.stop()
+            filename, data = "profile.folded", sampler.folded()
+
+        try:
+            await run_in_threadpool(_store, profile_id, filename, data)
+        except Exception as e:
+            print(f"Could not store profile {profile_id}: {e}")
+        for message in last_body:
+            await send(message)
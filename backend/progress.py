@@ -0,0 +1,154 @@
+import asyncio
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal, upsert
+from . import models
+from .background import BackgroundLoop
+
+# Configuration
+FLUSH_INTERVAL_SECONDS = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "2"))
+MAX_PENDING = int(os.getenv("PROGRESS_MAX_PENDING", "1000"))  # flush early once this many marks wait
+FLUSH_BATCH_SIZE = 500
+
+# (content_type, content_id) -> mark, per user
+Marks = Dict[int, Dict[Tuple[str, int], dict]]
+
+
+def write_marks(connection, rows: List[dict]) -> None:
+    """Write marks with one upsert per batch; an older mark never overwrites a newer one."""
+    upsert(
+        connection, models.Progress, rows,
+        lambda excluded: {
+            "status": excluded.status,
+            "updated_at": excluded.updated_at,
+            # Keep the first completion time across repeated completions
+            "completed_at": case(
+                (excluded.status == "completed",
+                 func.coalesce(models.Progress.completed_at, excluded.completed_at)),
+                else_=None,
+            ),
+        },
+        # Workers flush independently, so batches can arrive out of order
+        where=lambda excluded: models.Progress.updated_at <= excluded.updated_at,
+    )
+
+
+class ProgressBuffer(BackgroundLoop):
+    """Progress marks waiting to be written, coalesced per user and item.
+
+    Marks are upserted in batches every FLUSH_INTERVAL_SECONDS, or sooner once
+    MAX_PENDING are waiting, and on shutdown. Marks buffered by a worker that
+    dies without shutting down are lost.
+    """
+
+    name = "Progress flush"
+
+    def __init__(self):
+        super().__init__(FLUSH_INTERVAL_SECONDS)
+        self._pending: Marks = {}
+        self._count = 0
+        # Marks being written, still served to readers until they commit
+        self._flushing: Marks = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.flushed = 0
+
+    async def stop(self):
+        await super().stop()
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception as e:
+            print(f"Progress flush on shutdown failed, {self._count} marks lost: {e}")
+
+    def mark(self, user_id: int, content_type: str, content_id: int, status: str) -> dict:
+        now = datetime.utcnow()
+        with self._lock:
+            marks = self._pending.setdefault(user_id, {})
+            previous = marks.get((content_type, content_id))
+            completed_at = None
+            if status == "completed":
+                completed_at = previous and previous["completed_at"] or now
+            if previous is None:
+                self._count += 1
+            marks[(content_type, content_id)] = row = {
+                "user_id": user_id,
+                "content_type": content_type,
+                "content_id": content_id,
+                "status": status,
+                "updated_at": now,
+                "completed_at": completed_at,
+            }
+            full = self._count >= MAX_PENDING
+        if full:
+            self.wake()
+        return row
+
+    def pending(self, user_id: int) -> List[dict]:
+        """The user's marks not yet committed, oldest first."""
+        with self._lock:
+            return list(self._flushing.get(user_id, {}).values()) + list(self._pending.get(user_id, {}).values())
+
+    def flush(self) -> int:
+        """Upsert every buffered mark in batches and commit. Returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                self._flushing, self._pending, self._count = self._pending, {}, 0
+            rows = [row for marks in self._flushing.values() for row in marks.values()]
+            if not rows:
+                return 0
+            db = SessionLocal()
+            try:
+                for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+                    write_marks(db.connection(), rows[start:start + FLUSH_BATCH_SIZE])
+                db.commit()
+            except Exception:
+                db.rollback()
+                # Put the marks back under any newer ones for the next attempt
+                with self._lock:
+                    for user_id, marks in self._flushing.items():
+                        newer = self._pending.setdefault(user_id, {})
+                        self._count += len(marks.keys() - newer.keys())
+                        self._pending[user_id] = {**marks, **newer}
+                    self._flushing = {}
+                raise
+            finally:
+                db.close()
+            with self._lock:
+                self._flushing = {}
+            self.flushed += len(rows)
+            return len(rows)
+
+    async def step(self) -> bool:
+        # Marks that failed to write stay buffered for the next step
+        await asyncio.to_thread(self.flush)
+        return False
+
+
+buffer = ProgressBuffer()
+
+
+def for_user(db: Session, user_id: int, content_type: Optional[str] = None) -> List[dict]:
+    """A user's progress in one query on the table's key, with their buffered marks applied."""
+    progress = models.Progress
+    query = db.query(
+        progress.content_type, progress.content_id, progress.status, progress.updated_at, progress.completed_at
+    ).filter(progress.user_id == user_id)
+    if content_type:
+        query = query.filter(progress.content_type == content_type)
+    items = {(row.content_type, row.content_id): row._asdict() for row in query}
+
+    for row in buffer.pending(user_id):
+        if content_type and row["content_type"] != content_type:
+            continue
+        key = (row["content_type"], row["content_id"])
+        stored = items.get(key)
+        if stored and row["status"] == "completed" and stored["completed_at"]:
+            row = {**row, "completed_at": stored["completed_at"]}
+        items[key] = row
+    return list(items.values())
@@ -0,0 +1,193 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from .auth import SECRET_KEY, ALGORITHM
+
+# Configuration
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# Optional path to a SQLite file shared by all workers on the host
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Route group -> (bucket capacity, tokens refilled per second)
+RATE_LIMITS = {
+    "auth": (10, 10 / 60),
+    "search": (20, 1.0),
+    "default": (120, 20.0),
+}
+
+AUTH_PATHS = {"/api/auth/token", "/api/auth/register", "/api/auth/create-admin"}
+LIST_PATHS = {"/api/concepts/", "/api/implementations/", "/api/problems/"}
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: int, rate: float) -> float:
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryBucketStore:
+    """Token buckets kept in an LRU-bounded dict, local to one worker."""
+
+    blocking = False
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float, cost: float = 1.0) -> float:
+        """Consume ``cost`` tokens; return 0 if allowed, else seconds until allowed."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            tokens = capacity if bucket is None else _refill(bucket[0], bucket[1], now, capacity, rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            # Evicting the least recently used bucket only ever forgives a client
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite file so several workers share one budget."""
+
+    # Waits on other workers' locks, so it must not run on the event loop
+    blocking = True
+
+    def __init__(self, path: str, prune_every: int = 1000):
+        self.path = path
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._calls = 0
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: int, rate: float, cost: float = 1.0) -> float:
+        # Wall clock, since monotonic clocks are not comparable across processes
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else _refill(row[0], row[1], now, capacity, rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            self._calls += 1
+            if self._calls % self.prune_every == 0:
+                # A bucket idle long enough to refill completely carries no state
+                longest_refill = max(cap / r for cap, r in RATE_LIMITS.values())
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - longest_refill,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+def route_group(request: Request) -> Optional[str]:
+    """Map a request to its rate limit group, or None if it is not limited."""
+    path = request.url.path
+    if not path.startswith("/api/"):
+        return None
+    if path in AUTH_PATHS:
+        return "auth"
+    if request.method == "GET" and path in LIST_PATHS and request.query_params.get("q"):
+        return "search"
+    return "default"
+
+
+def client_key(request: Request) -> str:
+    """Identify the caller by the user in a valid bearer token, else by IP.
+
+    Behind a proxy the IP is only the client's if uvicorn trusts the proxy's
+    X-Forwarded-For (FORWARDED_ALLOW_IPS); otherwise every anonymous client
+    shares the proxy's buckets, including the strict auth group.
+    """
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}"
+
+
+def get_store():
+    if RATE_LIMIT_DB:
+        return SQLiteBucketStore(RATE_LIMIT_DB)
+    return MemoryBucketStore()
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, store=None):
+        self.app = app
+        self.store = store or get_store()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        group = route_group(request)
+        if group is None or request.method == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        capacity, rate = RATE_LIMITS[group]
+        key = f"{group}:{client_key(request)}"
+        try:
+            if self.store.blocking:
+                wait = await run_in_threadpool(self.store.take, key, capacity, rate)
+            else:
+                wait = self.store.take(key, capacity, rate)
+        except sqlite3.Error as e:
+            # Failing open: an unavailable limiter must not take the API down with it
+            print(f"Rate limit store error, allowing request: {e}")
+            wait = 0.0
+        if wait > 0:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
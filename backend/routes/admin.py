@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session
+
+from ..db import get_db, get_read_db
+from .. import schemas, auth, tasks, stats, profiling, deadlines, coalesce
+
+router = APIRouter(tags=["admin"])
+
+
+@router.get("/jobs")
+def job_queue_stats(
+    db: Session = Depends(get_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Outbox depth and job latency for this worker"""
+    return tasks.queue.stats(db)
+
+
+@router.get("/stats")
+def content_stats(
+    db: Session = Depends(get_read_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Content counts per type by status, difficulty and tag"""
+    return stats.get_stats(db)
+
+
+@router.get("/deadlines")
+def deadline_stats(
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Requests this worker failed with 503 for running past their deadline"""
+    return {
+        "timeout_seconds": deadlines.REQUEST_TIMEOUT_SECONDS,
+        "timeouts": sum(deadlines.timeouts.values()),
+        "by_route": dict(deadlines.timeouts),
+    }
+
+
+@router.get("/coalescing")
+def coalescing_stats(
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Content reads this worker served from the cache, a shared query, or its own query"""
+    return {
+        "cache_ttl_seconds": coalesce.CACHE_TTL_SECONDS,
+        "cached_responses": len(coalesce.cache),
+        **{how: coalesce.counts[how] for how in ("cached", "coalesced", "fetched")},
+    }
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(
+    profile_id: str,
+    db: Session = Depends(get_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Profile captured for a request sent with the X-Profile header"""
+    # Read the primary: the profile was written moments ago, possibly by another worker
+    profile = profiling.get_profile(db, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    filename, data = profile
+    return Response(
+        content=data,
+        media_type="text/plain" if filename.endswith(".folded") else "application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,9 +1,9 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from ..db import get_db
+from ..db import get_db, get_read_db
 from .. import models, schemas, auth
 
 router = APIRouter(tags=["authentication"])
@@ -55,14 +55,34 @@ async def login_for_access_token(
     
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=auth.token_claims(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@router.post("/logout", status_code=204)
+def logout(
+    db: Session = Depends(get_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Revoke every token issued to the current user"""
+    db.query(models.User).filter(models.User.id == current_user.id).update(
+        {"token_version": models.User.token_version + 1, "token_version_changed_at": datetime.utcnow()},
+        synchronize_session=False,
+    )
+    db.commit()
+    return None
+
+
 @router.get("/me", response_model=schemas.UserOut)
-async def read_users_me(current_user: models.User = Depends(auth.get_current_active_user)):
-    return current_user
+def read_users_me(
+    db: Session = Depends(get_read_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
 
 @router.post("/create-admin")
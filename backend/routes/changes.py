@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..db import get_db
+from .. import auth, schemas
+from ..changes import TICKET_TTL_SECONDS, feed, issue_ticket, redeem_ticket, stream
+
+router = APIRouter(tags=["changes"])
+
+
+@router.post("/ticket", response_model=schemas.ChangeStreamTicket)
+def create_stream_ticket(
+    db: Session = Depends(get_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """A single-use ticket for opening the change stream"""
+    ticket = issue_ticket(db, current_user)
+    db.commit()
+    return {"ticket": ticket, "expires_in": TICKET_TTL_SECONDS}
+
+
+@router.get("/")
+async def stream_changes(
+    ticket: str | None = Query(default=None, description="Single-use ticket from POST /api/changes/ticket"),
+    since: str | None = Query(default=None, description="Resume after this event id, for clients reconnecting with a new ticket"),
+    last_event_id: str | None = Header(default=None, description="Resume after this event id"),
+):
+    """Server-Sent Events feed of content changes, resumable with Last-Event-ID"""
+    is_admin = await run_in_threadpool(redeem_ticket, ticket) if ticket else None
+    if is_admin is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired ticket")
+
+    last_event_id = last_event_id or since
+    try:
+        since_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    subscriber = feed.subscribe(is_admin)
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many change feed subscribers", headers={"Retry-After": "5"})
+    return StreamingResponse(
+        stream(subscriber, since_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,59 +1,75 @@
 from typing import List
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 
-from ..db import get_db
-from .. import models, schemas, auth
+from ..db import get_db, get_read_db
+from .. import models, schemas, auth, tasks, bulk, sections, listing, archive
+from ..pagination import total_count, set_total_headers
 
 router = APIRouter(tags=["concepts"])
 
 
 @router.get("/", response_model=List[schemas.ConceptDetail])
 def list_concepts(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user),
     q: str | None = Query(default=None, description="Search by title or slug"),
     difficulty: str | None = Query(default=None, description="Filter by difficulty"),
     tags: str | None = Query(default=None, description="Filter by tags"),
     status: str | None = Query(default=None, description="Filter by status"),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    include_total: bool = Query(default=False, description="Return X-Total-Count and X-Total-Exact headers"),
 ):
-    query = db.query(models.Concept).options(joinedload(models.Concept.author))
+    # Archived concepts live in the archive tier
+    model = models.ArchivedConcept if status == "archived" and current_user.is_admin else models.Concept
+    query = db.query(model)
     
     # Non-admin users can only see published concepts
     if not current_user.is_admin:
-        query = query.filter(models.Concept.status == "published")
+        query = query.filter(model.status == "published")
     
     # Apply search filter
     if q:
         query = query.filter(
-            (models.Concept.title.ilike(f"%{q}%")) | 
-            (models.Concept.slug.ilike(f"%{q}%")) |
-            (models.Concept.description.ilike(f"%{q}%"))
+            (model.title.ilike(f"%{q}%")) | 
+            (model.slug.ilike(f"%{q}%")) |
+            (model.description.ilike(f"%{q}%"))
         )
     
     # Apply difficulty filter
     if difficulty:
-        query = query.filter(models.Concept.difficulty == difficulty)
+        query = query.filter(model.difficulty == difficulty)
     
     # Apply tags filter
     if tags:
-        query = query.filter(models.Concept.tags.ilike(f"%{tags}%"))
+        query = query.filter(model.tags.ilike(f"%{tags}%"))
     
     # Apply status filter
     if status:
-        query = query.filter(models.Concept.status == status)
+        query = query.filter(model.status == status)
+    
+    if include_total:
+        total, exact = total_count(
+            db, query, "concepts",
+            status=status or (None if current_user.is_admin else "published"),
+            difficulty=difficulty,
+            other_filters=bool(q or tags),
+        )
+        set_total_headers(response, total, exact)
     
-    return query.order_by(models.Concept.created_at.desc()).offset(offset).limit(limit).all()
+    # Serialize column tuples straight to JSON instead of ORM objects and pydantic models
+    return listing.page_response(query, offset, limit, response)
 
 
 @router.get("/{concept_id}", response_model=schemas.ConceptDetail)
 def get_concept(
     concept_id: int, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
 ):
     query = db.query(models.Concept).filter(models.Concept.id == concept_id)
     
@@ -62,23 +78,81 @@ def get_concept(
         query = query.filter(models.Concept.status == "published")
     
     concept = query.first()
+    if not concept and current_user.is_admin:
+        concept = archive.get_archived(db, "concepts", concept_id)
     if not concept:
         raise HTTPException(status_code=404, detail="Concept not found")
     return concept
 
 
+@router.get("/{concept_id}/toc", response_model=schemas.TableOfContents)
+def get_concept_toc(
+    concept_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Section headings and offsets, without the content itself"""
+    query = db.query(
+        models.Concept.id, models.Concept.title, func.length(models.Concept.content_mdx).label("length")
+    ).filter(models.Concept.id == concept_id)
+    
+    # Non-admin users can only see published concepts
+    if not current_user.is_admin:
+        query = query.filter(models.Concept.status == "published")
+    
+    concept = query.first()
+    if not concept:
+        raise HTTPException(status_code=404, detail="Concept not found")
+    return {
+        "id": concept.id,
+        "title": concept.title,
+        "length": concept.length,
+        "sections": sections.table_of_contents(db, "concepts", concept_id),
+    }
+
+
+@router.get("/{concept_id}/sections/{position}", response_model=schemas.SectionContent)
+def get_concept_section(
+    concept_id: int,
+    position: int,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """One section of the concept's MDX, sliced out by the database"""
+    section = models.ContentSection
+    query = db.query(
+        section,
+        func.substr(models.Concept.content_mdx, section.start_offset + 1, section.end_offset - section.start_offset),
+    ).join(models.Concept, models.Concept.id == section.content_id).filter(
+        section.content_type == "concepts",
+        section.content_id == concept_id,
+        section.position == position,
+    )
+    
+    # Non-admin users can only see published concepts
+    if not current_user.is_admin:
+        query = query.filter(models.Concept.status == "published")
+    
+    row = query.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Section not found")
+    found, content = row
+    return {**schemas.SectionOut.model_validate(found).model_dump(), "content": content}
+
+
 @router.post("/", response_model=schemas.ConceptDetail)
 def create_concept(
     payload: schemas.ConceptCreate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
-    existing = db.query(models.Concept).filter(models.Concept.slug == payload.slug).first()
-    if existing:
+    if archive.slug_taken(db, "concepts", payload.slug):
         raise HTTPException(status_code=400, detail="Slug already exists")
     
     concept = models.Concept(**payload.model_dump(), author_id=current_user.id)
     db.add(concept)
+    if concept.status == "archived":
+        return archive.archive_item(db, "concepts", concept)
     db.commit()
     db.refresh(concept)
     # Reload with author information
@@ -90,29 +164,39 @@ def update_concept(
     concept_id: int, 
     payload: schemas.ConceptUpdate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     concept = db.query(models.Concept).options(joinedload(models.Concept.author)).filter(models.Concept.id == concept_id).first()
     if not concept:
-        raise HTTPException(status_code=404, detail="Concept not found")
+        if not archive.get_archived(db, "concepts", concept_id):
+            raise HTTPException(status_code=404, detail="Concept not found")
+        # Setting a draft or published status restores an archived concept
+        if payload.status not in archive.RESTORE_STATUSES:
+            raise HTTPException(status_code=409, detail="Concept is archived; set status to draft or published to restore it")
+        restored, conflicts = archive.unarchive(db, "concepts", [concept_id], payload.status)
+        if conflicts:
+            raise HTTPException(status_code=400, detail="Slug already exists")
+        concept = db.query(models.Concept).options(joinedload(models.Concept.author)).filter(models.Concept.id == concept_id).first()
     
     # Check if user is author or admin
     if concept.author_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     if payload.slug and payload.slug != concept.slug:
-        exists = db.query(models.Concept).filter(models.Concept.slug == payload.slug).first()
-        if exists:
+        if archive.slug_taken(db, "concepts", payload.slug):
             raise HTTPException(status_code=400, detail="Slug already exists")
     
     # Update published_at when status changes to published
     if payload.status == "published" and concept.status != "published":
         concept.published_at = datetime.utcnow()
+        tasks.enqueue(db, "publish", "concepts", concept.id)
     
     for key, value in payload.model_dump(exclude_unset=True).items():
         setattr(concept, key, value)
     
     db.add(concept)
+    if concept.status == "archived":
+        return archive.archive_item(db, "concepts", concept)
     db.commit()
     db.refresh(concept)
     # Reload with author information
@@ -123,11 +207,14 @@ def update_concept(
 def delete_concept(
     concept_id: int, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     concept = db.query(models.Concept).filter(models.Concept.id == concept_id).first()
     if not concept:
-        raise HTTPException(status_code=404, detail="Concept not found")
+        # Archived concepts are deleted from the archive tier
+        if not bulk.apply_action(db, "concepts", [concept_id], "delete")[0]["ok"]:
+            raise HTTPException(status_code=404, detail="Concept not found")
+        return None
     
     # Check if user is author or admin
     if concept.author_id != current_user.id and not current_user.is_admin:
@@ -138,18 +225,36 @@ def delete_concept(
     return None
 
 
+@router.post("/bulk", response_model=schemas.BulkResult)
+def bulk_update_concepts(
+    payload: schemas.BulkAction,
+    db: Session = Depends(get_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Publish, unpublish, archive or delete many concepts in one transaction"""
+    return {"results": bulk.apply_action(db, "concepts", payload.ids, payload.action)}
+
+
 @router.post("/{concept_id}/publish", response_model=schemas.ConceptDetail)
 def publish_concept(
     concept_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     concept = db.query(models.Concept).options(joinedload(models.Concept.author)).filter(models.Concept.id == concept_id).first()
     if not concept:
-        raise HTTPException(status_code=404, detail="Concept not found")
+        # Publishing an archived concept restores it
+        restored, conflicts = archive.unarchive(db, "concepts", [concept_id], "published")
+        if conflicts:
+            raise HTTPException(status_code=400, detail="Slug already exists")
+        if not restored:
+            raise HTTPException(status_code=404, detail="Concept not found")
+        db.commit()
+        return db.query(models.Concept).options(joinedload(models.Concept.author)).filter(models.Concept.id == concept_id).first()
     
     concept.status = "published"
     concept.published_at = datetime.utcnow()
+    tasks.enqueue(db, "publish", "concepts", concept.id)
     
     db.add(concept)
     db.commit()
@@ -158,10 +263,31 @@ def publish_concept(
     return db.query(models.Concept).options(joinedload(models.Concept.author)).filter(models.Concept.id == concept_id).first()
 
 
+@router.post("/{concept_id}/unarchive", response_model=schemas.ConceptDetail)
+def unarchive_concept(
+    concept_id: int,
+    status: str = Query(default="draft", description="Status to restore: draft or published"),
+    db: Session = Depends(get_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Move an archived concept back out of the archive tier"""
+    if status not in archive.RESTORE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of: {list(archive.RESTORE_STATUSES)}")
+    
+    restored, conflicts = archive.unarchive(db, "concepts", [concept_id], status)
+    if conflicts:
+        raise HTTPException(status_code=400, detail="Slug already exists")
+    if not restored:
+        raise HTTPException(status_code=404, detail="Archived concept not found")
+    
+    db.commit()
+    return db.query(models.Concept).options(joinedload(models.Concept.author)).filter(models.Concept.id == concept_id).first()
+
+
 @router.get("/all/slugs")
 def get_concept_slugs(
-    current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_read_db)
 ):
     """Get all concept slugs for tag validation"""
     concepts = db.query(models.Concept).filter(models.Concept.status == "published").all()
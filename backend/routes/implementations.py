@@ -1,59 +1,74 @@
 from typing import List
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session, joinedload
 
-from ..db import get_db
-from .. import models, schemas, auth
+from ..db import get_db, get_read_db
+from .. import models, schemas, auth, tasks, bulk, listing, archive
+from ..pagination import total_count, set_total_headers
 
 router = APIRouter(tags=["implementations"])
 
 
 @router.get("/", response_model=List[schemas.ImplementationDetail])
 def list_implementations(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user),
     q: str | None = Query(default=None, description="Search by title or slug"),
     difficulty: str | None = Query(default=None, description="Filter by difficulty"),
     tags: str | None = Query(default=None, description="Filter by tags"),
     status: str | None = Query(default=None, description="Filter by status"),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    include_total: bool = Query(default=False, description="Return X-Total-Count and X-Total-Exact headers"),
 ):
-    query = db.query(models.Implementation).options(joinedload(models.Implementation.author))
+    # Archived implementations live in the archive tier
+    model = models.ArchivedImplementation if status == "archived" and current_user.is_admin else models.Implementation
+    query = db.query(model)
     
     # Non-admin users can only see published implementations
     if not current_user.is_admin:
-        query = query.filter(models.Implementation.status == "published")
+        query = query.filter(model.status == "published")
     
     # Apply search filter
     if q:
         query = query.filter(
-            (models.Implementation.title.ilike(f"%{q}%")) | 
-            (models.Implementation.slug.ilike(f"%{q}%")) |
-            (models.Implementation.description.ilike(f"%{q}%"))
+            (model.title.ilike(f"%{q}%")) | 
+            (model.slug.ilike(f"%{q}%")) |
+            (model.description.ilike(f"%{q}%"))
         )
     
     # Apply difficulty filter
     if difficulty:
-        query = query.filter(models.Implementation.difficulty == difficulty)
+        query = query.filter(model.difficulty == difficulty)
     
     # Apply tags filter
     if tags:
-        query = query.filter(models.Implementation.tags.ilike(f"%{tags}%"))
+        query = query.filter(model.tags.ilike(f"%{tags}%"))
     
     # Apply status filter
     if status:
-        query = query.filter(models.Implementation.status == status)
+        query = query.filter(model.status == status)
+    
+    if include_total:
+        total, exact = total_count(
+            db, query, "implementations",
+            status=status or (None if current_user.is_admin else "published"),
+            difficulty=difficulty,
+            other_filters=bool(q or tags),
+        )
+        set_total_headers(response, total, exact)
     
-    return query.order_by(models.Implementation.created_at.desc()).offset(offset).limit(limit).all()
+    # Serialize column tuples straight to JSON instead of ORM objects and pydantic models
+    return listing.page_response(query, offset, limit, response)
 
 
 @router.get("/{implementation_id}", response_model=schemas.ImplementationDetail)
 def get_implementation(
     implementation_id: int, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
 ):
     query = db.query(models.Implementation).filter(models.Implementation.id == implementation_id)
     
@@ -62,6 +77,8 @@ def get_implementation(
         query = query.filter(models.Implementation.status == "published")
     
     implementation = query.first()
+    if not implementation and current_user.is_admin:
+        implementation = archive.get_archived(db, "implementations", implementation_id)
     if not implementation:
         raise HTTPException(status_code=404, detail="Implementation not found")
     return implementation
@@ -71,14 +88,15 @@ def get_implementation(
 def create_implementation(
     payload: schemas.ImplementationCreate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
-    existing = db.query(models.Implementation).filter(models.Implementation.slug == payload.slug).first()
-    if existing:
+    if archive.slug_taken(db, "implementations", payload.slug):
         raise HTTPException(status_code=400, detail="Slug already exists")
     
     implementation = models.Implementation(**payload.model_dump(), author_id=current_user.id)
     db.add(implementation)
+    if implementation.status == "archived":
+        return archive.archive_item(db, "implementations", implementation)
     db.commit()
     db.refresh(implementation)
     # Reload with author information
@@ -90,29 +108,39 @@ def update_implementation(
     implementation_id: int, 
     payload: schemas.ImplementationUpdate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     implementation = db.query(models.Implementation).options(joinedload(models.Implementation.author)).filter(models.Implementation.id == implementation_id).first()
     if not implementation:
-        raise HTTPException(status_code=404, detail="Implementation not found")
+        if not archive.get_archived(db, "implementations", implementation_id):
+            raise HTTPException(status_code=404, detail="Implementation not found")
+        # Setting a draft or published status restores an archived implementation
+        if payload.status not in archive.RESTORE_STATUSES:
+            raise HTTPException(status_code=409, detail="Implementation is archived; set status to draft or published to restore it")
+        restored, conflicts = archive.unarchive(db, "implementations", [implementation_id], payload.status)
+        if conflicts:
+            raise HTTPException(status_code=400, detail="Slug already exists")
+        implementation = db.query(models.Implementation).options(joinedload(models.Implementation.author)).filter(models.Implementation.id == implementation_id).first()
     
     # Check if user is author or admin
     if implementation.author_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     if payload.slug and payload.slug != implementation.slug:
-        exists = db.query(models.Implementation).filter(models.Implementation.slug == payload.slug).first()
-        if exists:
+        if archive.slug_taken(db, "implementations", payload.slug):
             raise HTTPException(status_code=400, detail="Slug already exists")
     
     # Update published_at when status changes to published
     if payload.status == "published" and implementation.status != "published":
         implementation.published_at = datetime.utcnow()
+        tasks.enqueue(db, "publish", "implementations", implementation.id)
     
     for key, value in payload.model_dump(exclude_unset=True).items():
         setattr(implementation, key, value)
     
     db.add(implementation)
+    if implementation.status == "archived":
+        return archive.archive_item(db, "implementations", implementation)
     db.commit()
     db.refresh(implementation)
     # Reload with author information
@@ -123,11 +151,14 @@ def update_implementation(
 def delete_implementation(
     implementation_id: int, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     implementation = db.query(models.Implementation).filter(models.Implementation.id == implementation_id).first()
     if not implementation:
-        raise HTTPException(status_code=404, detail="Implementation not found")
+        # Archived implementations are deleted from the archive tier
+        if not bulk.apply_action(db, "implementations", [implementation_id], "delete")[0]["ok"]:
+            raise HTTPException(status_code=404, detail="Implementation not found")
+        return None
     
     # Check if user is author or admin
     if implementation.author_id != current_user.id and not current_user.is_admin:
@@ -138,21 +169,60 @@ def delete_implementation(
     return None
 
 
+@router.post("/bulk", response_model=schemas.BulkResult)
+def bulk_update_implementations(
+    payload: schemas.BulkAction,
+    db: Session = Depends(get_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Publish, unpublish, archive or delete many implementations in one transaction"""
+    return {"results": bulk.apply_action(db, "implementations", payload.ids, payload.action)}
+
+
 @router.post("/{implementation_id}/publish", response_model=schemas.ImplementationDetail)
 def publish_implementation(
     implementation_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     implementation = db.query(models.Implementation).options(joinedload(models.Implementation.author)).filter(models.Implementation.id == implementation_id).first()
     if not implementation:
-        raise HTTPException(status_code=404, detail="Implementation not found")
+        # Publishing an archived implementation restores it
+        restored, conflicts = archive.unarchive(db, "implementations", [implementation_id], "published")
+        if conflicts:
+            raise HTTPException(status_code=400, detail="Slug already exists")
+        if not restored:
+            raise HTTPException(status_code=404, detail="Implementation not found")
+        db.commit()
+        return db.query(models.Implementation).options(joinedload(models.Implementation.author)).filter(models.Implementation.id == implementation_id).first()
     
     implementation.status = "published"
     implementation.published_at = datetime.utcnow()
+    tasks.enqueue(db, "publish", "implementations", implementation.id)
     
     db.add(implementation)
     db.commit()
     db.refresh(implementation)
     # Reload with author information
     return db.query(models.Implementation).options(joinedload(models.Implementation.author)).filter(models.Implementation.id == implementation_id).first()
+
+
+@router.post("/{implementation_id}/unarchive", response_model=schemas.ImplementationDetail)
+def unarchive_implementation(
+    implementation_id: int,
+    status: str = Query(default="draft", description="Status to restore: draft or published"),
+    db: Session = Depends(get_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Move an archived implementation back out of the archive tier"""
+    if status not in archive.RESTORE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of: {list(archive.RESTORE_STATUSES)}")
+    
+    restored, conflicts = archive.unarchive(db, "implementations", [implementation_id], status)
+    if conflicts:
+        raise HTTPException(status_code=400, detail="Slug already exists")
+    if not restored:
+        raise HTTPException(status_code=404, detail="Archived implementation not found")
+    
+    db.commit()
+    return db.query(models.Implementation).options(joinedload(models.Implementation.author)).filter(models.Implementation.id == implementation_id).first()
@@ -1,59 +1,74 @@
 from typing import List
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session, joinedload
 
-from ..db import get_db
-from .. import models, schemas, auth
+from ..db import get_db, get_read_db
+from .. import models, schemas, auth, tasks, bulk, listing, archive
+from ..pagination import total_count, set_total_headers
 
 router = APIRouter(tags=["problems"])
 
 
 @router.get("/", response_model=List[schemas.ProblemDetail])
 def list_problems(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user),
     q: str | None = Query(default=None, description="Search by title or slug"),
     difficulty: str | None = Query(default=None, description="Filter by difficulty"),
     tags: str | None = Query(default=None, description="Filter by tags"),
     status: str | None = Query(default=None, description="Filter by status"),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    include_total: bool = Query(default=False, description="Return X-Total-Count and X-Total-Exact headers"),
 ):
-    query = db.query(models.Problem).options(joinedload(models.Problem.author))
+    # Archived problems live in the archive tier
+    model = models.ArchivedProblem if status == "archived" and current_user.is_admin else models.Problem
+    query = db.query(model)
     
     # Non-admin users can only see published problems
     if not current_user.is_admin:
-        query = query.filter(models.Problem.status == "published")
+        query = query.filter(model.status == "published")
     
     # Apply search filter
     if q:
         query = query.filter(
-            (models.Problem.title.ilike(f"%{q}%")) | 
-            (models.Problem.slug.ilike(f"%{q}%")) |
-            (models.Problem.description.ilike(f"%{q}%"))
+            (model.title.ilike(f"%{q}%")) | 
+            (model.slug.ilike(f"%{q}%")) |
+            (model.description.ilike(f"%{q}%"))
         )
     
     # Apply difficulty filter
     if difficulty:
-        query = query.filter(models.Problem.difficulty == difficulty)
+        query = query.filter(model.difficulty == difficulty)
     
     # Apply tags filter
     if tags:
-        query = query.filter(models.Problem.tags.ilike(f"%{tags}%"))
+        query = query.filter(model.tags.ilike(f"%{tags}%"))
     
     # Apply status filter
     if status:
-        query = query.filter(models.Problem.status == status)
+        query = query.filter(model.status == status)
+    
+    if include_total:
+        total, exact = total_count(
+            db, query, "problems",
+            status=status or (None if current_user.is_admin else "published"),
+            difficulty=difficulty,
+            other_filters=bool(q or tags),
+        )
+        set_total_headers(response, total, exact)
     
-    return query.order_by(models.Problem.created_at.desc()).offset(offset).limit(limit).all()
+    # Serialize column tuples straight to JSON instead of ORM objects and pydantic models
+    return listing.page_response(query, offset, limit, response)
 
 
 @router.get("/{problem_id}", response_model=schemas.ProblemDetail)
 def get_problem(
     problem_id: int, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
 ):
     query = db.query(models.Problem).filter(models.Problem.id == problem_id)
     
@@ -62,6 +77,8 @@ def get_problem(
         query = query.filter(models.Problem.status == "published")
     
     problem = query.first()
+    if not problem and current_user.is_admin:
+        problem = archive.get_archived(db, "problems", problem_id)
     if not problem:
         raise HTTPException(status_code=404, detail="Problem not found")
     return problem
@@ -71,14 +88,15 @@ def get_problem(
 def create_problem(
     payload: schemas.ProblemCreate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
-    existing = db.query(models.Problem).filter(models.Problem.slug == payload.slug).first()
-    if existing:
+    if archive.slug_taken(db, "problems", payload.slug):
         raise HTTPException(status_code=400, detail="Slug already exists")
     
     problem = models.Problem(**payload.model_dump(), author_id=current_user.id)
     db.add(problem)
+    if problem.status == "archived":
+        return archive.archive_item(db, "problems", problem)
     db.commit()
     db.refresh(problem)
     # Reload with author information
@@ -90,29 +108,39 @@ def update_problem(
     problem_id: int, 
     payload: schemas.ProblemUpdate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     problem = db.query(models.Problem).options(joinedload(models.Problem.author)).filter(models.Problem.id == problem_id).first()
     if not problem:
-        raise HTTPException(status_code=404, detail="Problem not found")
+        if not archive.get_archived(db, "problems", problem_id):
+            raise HTTPException(status_code=404, detail="Problem not found")
+        # Setting a draft or published status restores an archived problem
+        if payload.status not in archive.RESTORE_STATUSES:
+            raise HTTPException(status_code=409, detail="Problem is archived; set status to draft or published to restore it")
+        restored, conflicts = archive.unarchive(db, "problems", [problem_id], payload.status)
+        if conflicts:
+            raise HTTPException(status_code=400, detail="Slug already exists")
+        problem = db.query(models.Problem).options(joinedload(models.Problem.author)).filter(models.Problem.id == problem_id).first()
     
     # Check if user is author or admin
     if problem.author_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     if payload.slug and payload.slug != problem.slug:
-        exists = db.query(models.Problem).filter(models.Problem.slug == payload.slug).first()
-        if exists:
+        if archive.slug_taken(db, "problems", payload.slug):
             raise HTTPException(status_code=400, detail="Slug already exists")
     
     # Update published_at when status changes to published
     if payload.status == "published" and problem.status != "published":
         problem.published_at = datetime.utcnow()
+        tasks.enqueue(db, "publish", "problems", problem.id)
     
     for key, value in payload.model_dump(exclude_unset=True).items():
         setattr(problem, key, value)
     
     db.add(problem)
+    if problem.status == "archived":
+        return archive.archive_item(db, "problems", problem)
     db.commit()
     db.refresh(problem)
     # Reload with author information
@@ -123,11 +151,14 @@ def update_problem(
 def delete_problem(
     problem_id: int, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     problem = db.query(models.Problem).filter(models.Problem.id == problem_id).first()
     if not problem:
-        raise HTTPException(status_code=404, detail="Problem not found")
+        # Archived problems are deleted from the archive tier
+        if not bulk.apply_action(db, "problems", [problem_id], "delete")[0]["ok"]:
+            raise HTTPException(status_code=404, detail="Problem not found")
+        return None
     
     # Check if user is author or admin
     if problem.author_id != current_user.id and not current_user.is_admin:
@@ -138,21 +169,60 @@ def delete_problem(
     return None
 
 
+@router.post("/bulk", response_model=schemas.BulkResult)
+def bulk_update_problems(
+    payload: schemas.BulkAction,
+    db: Session = Depends(get_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Publish, unpublish, archive or delete many problems in one transaction"""
+    return {"results": bulk.apply_action(db, "problems", payload.ids, payload.action)}
+
+
 @router.post("/{problem_id}/publish", response_model=schemas.ProblemDetail)
 def publish_problem(
     problem_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
 ):
     problem = db.query(models.Problem).options(joinedload(models.Problem.author)).filter(models.Problem.id == problem_id).first()
     if not problem:
-        raise HTTPException(status_code=404, detail="Problem not found")
+        # Publishing an archived problem restores it
+        restored, conflicts = archive.unarchive(db, "problems", [problem_id], "published")
+        if conflicts:
+            raise HTTPException(status_code=400, detail="Slug already exists")
+        if not restored:
+            raise HTTPException(status_code=404, detail="Problem not found")
+        db.commit()
+        return db.query(models.Problem).options(joinedload(models.Problem.author)).filter(models.Problem.id == problem_id).first()
     
     problem.status = "published"
     problem.published_at = datetime.utcnow()
+    tasks.enqueue(db, "publish", "problems", problem.id)
     
     db.add(problem)
     db.commit()
     db.refresh(problem)
     # Reload with author information
     return db.query(models.Problem).options(joinedload(models.Problem.author)).filter(models.Problem.id == problem_id).first()
+
+
+@router.post("/{problem_id}/unarchive", response_model=schemas.ProblemDetail)
+def unarchive_problem(
+    problem_id: int,
+    status: str = Query(default="draft", description="Status to restore: draft or published"),
+    db: Session = Depends(get_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_admin_user)
+):
+    """Move an archived problem back out of the archive tier"""
+    if status not in archive.RESTORE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of: {list(archive.RESTORE_STATUSES)}")
+    
+    restored, conflicts = archive.unarchive(db, "problems", [problem_id], status)
+    if conflicts:
+        raise HTTPException(status_code=400, detail="Slug already exists")
+    if not restored:
+        raise HTTPException(status_code=404, detail="Archived problem not found")
+    
+    db.commit()
+    return db.query(models.Problem).options(joinedload(models.Problem.author)).filter(models.Problem.id == problem_id).first()
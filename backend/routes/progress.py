@@ -0,0 +1,43 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..db import get_db, get_read_db
+from .. import models, schemas, auth, progress
+
+router = APIRouter(tags=["progress"])
+
+
+@router.get("/", response_model=List[schemas.ProgressOut])
+def get_progress(
+    db: Session = Depends(get_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user),
+    type: str | None = Query(default=None, pattern="^(concepts|implementations|problems)$", description="Restrict to one content type"),
+):
+    """The caller's progress, including marks not yet written"""
+    # Marks are written by the flusher rather than the caller's session, so
+    # read-your-writes stickiness would not cover them; read the primary
+    return progress.for_user(db, current_user.id, type)
+
+
+@router.post("/{content_type}/{content_id}", response_model=schemas.ProgressOut, status_code=202)
+def mark_progress(
+    content_type: str,
+    content_id: int,
+    mark: schemas.ProgressMark,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Record progress on an item; it is written with the next batch"""
+    model = models.CONTENT_MODELS.get(content_type)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Unknown content type")
+    query = db.query(model.id).filter(model.id == content_id)
+
+    # Non-admin users can only track published content
+    if not current_user.is_admin:
+        query = query.filter(model.status == "published")
+
+    if query.first() is None:
+        raise HTTPException(status_code=404, detail="Content not found")
+    return progress.buffer.mark(current_user.id, content_type, content_id, mark.status)
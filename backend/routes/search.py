@@ -0,0 +1,18 @@
+from typing import List
+from fastapi import APIRouter, Depends, Query
+
+from .. import schemas, auth
+from ..search import index
+
+router = APIRouter(tags=["search"])
+
+
+@router.get("/", response_model=List[schemas.SearchHit])
+def fuzzy_search(
+    current_user: schemas.CurrentUser = Depends(auth.get_current_active_user),
+    q: str = Query(..., min_length=1, max_length=200, description="Typo-tolerant search over titles, slugs and tags"),
+    type: str | None = Query(default=None, pattern="^(concepts|implementations|problems)$", description="Restrict to one content type"),
+    limit: int = Query(default=20, ge=1, le=100),
+):
+    # Non-admin users can only find published content
+    return index.search(q, include_drafts=current_user.is_admin, content_type=type, limit=limit)
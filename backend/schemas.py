@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from pydantic import BaseModel, Field, validator
 import re
 
@@ -41,6 +41,17 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    user_id: Optional[int] = None
+    is_admin: bool = False
+    token_version: int = 0
+    issued_at: Optional[int] = None  # iat, absent from tokens issued before it was added
+
+
+class CurrentUser(BaseModel):
+    """Authenticated caller, as carried in the access token's claims"""
+    id: int
+    username: str
+    is_admin: bool
 
 
 # Base schemas for content modules
@@ -84,7 +95,12 @@ class ContentBase(BaseModel):
 
 # Concept schemas
 class ConceptCreate(ContentBase):
-    pass
+    @validator('slug')
+    def validate_slug(cls, v):
+        # Slugs name exported files and [[type:slug]] links, so no separators or dots
+        if not re.match(r'^[a-zA-Z0-9_-]+$', v):
+            raise ValueError('Slug should only contain letters, numbers, hyphens, and underscores.')
+        return v
 
 
 class ConceptUpdate(BaseModel):
@@ -96,6 +112,13 @@ class ConceptUpdate(BaseModel):
     tags: Optional[str] = None
     status: Optional[str] = None
 
+    @validator('slug')
+    def validate_slug(cls, v):
+        # Slugs name exported files and [[type:slug]] links, so no separators or dots
+        if v is not None and not re.match(r'^[a-zA-Z0-9_-]+$', v):
+            raise ValueError('Slug should only contain letters, numbers, hyphens, and underscores.')
+        return v
+
     @validator('difficulty')
     def validate_difficulty(cls, v):
         if v is not None:
@@ -142,9 +165,38 @@ class ConceptDetail(ConceptOut):
     author: UserOut
 
 
+# Section schemas for partial fetch of long MDX
+class SectionOut(BaseModel):
+    position: int
+    anchor: str
+    title: str
+    level: int
+    start_offset: int
+    end_offset: int
+
+    class Config:
+        from_attributes = True
+
+
+class SectionContent(SectionOut):
+    content: str
+
+
+class TableOfContents(BaseModel):
+    id: int
+    title: str
+    length: int  # characters in content_mdx
+    sections: List[SectionOut]
+
+
 # Implementation schemas
 class ImplementationCreate(ContentBase):
-    pass
+    @validator('slug')
+    def validate_slug(cls, v):
+        # Slugs name exported files and [[type:slug]] links, so no separators or dots
+        if not re.match(r'^[a-zA-Z0-9_-]+$', v):
+            raise ValueError('Slug should only contain letters, numbers, hyphens, and underscores.')
+        return v
 
 
 class ImplementationUpdate(BaseModel):
@@ -156,6 +208,13 @@ class ImplementationUpdate(BaseModel):
     tags: Optional[str] = None
     status: Optional[str] = None
 
+    @validator('slug')
+    def validate_slug(cls, v):
+        # Slugs name exported files and [[type:slug]] links, so no separators or dots
+        if v is not None and not re.match(r'^[a-zA-Z0-9_-]+$', v):
+            raise ValueError('Slug should only contain letters, numbers, hyphens, and underscores.')
+        return v
+
     @validator('difficulty')
     def validate_difficulty(cls, v):
         if v is not None:
@@ -204,7 +263,12 @@ class ImplementationDetail(ImplementationOut):
 
 # Problem schemas
 class ProblemCreate(ContentBase):
-    pass
+    @validator('slug')
+    def validate_slug(cls, v):
+        # Slugs name exported files and [[type:slug]] links, so no separators or dots
+        if not re.match(r'^[a-zA-Z0-9_-]+$', v):
+            raise ValueError('Slug should only contain letters, numbers, hyphens, and underscores.')
+        return v
 
 
 class ProblemUpdate(BaseModel):
@@ -216,6 +280,13 @@ class ProblemUpdate(BaseModel):
     tags: Optional[str] = None
     status: Optional[str] = None
 
+    @validator('slug')
+    def validate_slug(cls, v):
+        # Slugs name exported files and [[type:slug]] links, so no separators or dots
+        if v is not None and not re.match(r'^[a-zA-Z0-9_-]+$', v):
+            raise ValueError('Slug should only contain letters, numbers, hyphens, and underscores.')
+        return v
+
     @validator('difficulty')
     def validate_difficulty(cls, v):
         if v is not None:
@@ -262,5 +333,60 @@ class ProblemDetail(ProblemOut):
     author: UserOut
 
 
+# Bulk admin operations
+class BulkAction(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+    action: str  # publish, draft, archive, delete
+
+    @validator('action')
+    def validate_action(cls, v):
+        valid_actions = ['publish', 'draft', 'archive', 'delete']
+        if v not in valid_actions:
+            raise ValueError(f'Action must be one of: {valid_actions}')
+        return v
+
+
+class BulkItemResult(BaseModel):
+    id: int
+    ok: bool
+    status: Optional[str] = None  # status after the operation, None once deleted
+    detail: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    results: List[BulkItemResult]
+
+
+# Search schemas
+class SearchHit(BaseModel):
+    type: str  # concepts, implementations, problems
+    id: int
+    slug: str
+    title: str
+    score: float
+
+
+# Progress schemas
+class ProgressMark(BaseModel):
+    status: str  # started, completed
+
+    @validator('status')
+    def validate_status(cls, v):
+        valid_statuses = ['started', 'completed']
+        if v not in valid_statuses:
+            raise ValueError(f'Status must be one of: {valid_statuses}')
+        return v
+
+
+class ProgressOut(BaseModel):
+    content_type: str  # concepts, implementations, problems
+    content_id: int
+    status: str
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
 
 
+# Change feed schemas
+class ChangeStreamTicket(BaseModel):
+    ticket: str  # pass as ?ticket= when opening the stream; works once
+    expires_in: int  # seconds
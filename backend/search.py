@@ -0,0 +1,251 @@
+import heapq
+import math
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal
+from . import models, invalidation, tasks
+from .changes import REORDER_WINDOW
+
+# Minimum share of the query's trigrams a document must contain
+MIN_SIMILARITY = 0.5
+# Rebuild posting lists once this share of documents are tombstones
+COMPACT_RATIO = 0.25
+# Re-read rows this close to the newest seen updated_at, to tolerate slow commits
+WATERMARK_MARGIN = timedelta(seconds=5)
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def trigrams(text: str) -> Set[str]:
+    """Padded per-word trigrams, in the style of pg_trgm."""
+    grams = set()
+    for word in WORD_PATTERN.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """In-memory trigram inverted index over titles, slugs and tags.
+
+    Documents are numbered densely; each trigram maps to an array of
+    document numbers (4 bytes per posting). Updates append a new document
+    and tombstone the old one, and the postings are compacted when
+    tombstones pile up.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, array] = {}
+        self._docs: List[Optional[tuple]] = []  # docno -> (content_type, id, slug, title, published)
+        self._sizes = array("H")  # docno -> number of trigrams
+        self._docno: Dict[tuple, int] = {}  # (content_type, id) -> docno
+        self._dead = 0
+        self._watermarks: Dict[str, datetime] = {}
+        self._dirty: Set[str] = set(models.CONTENT_MODELS)
+        # Position in change_events, which is where deletes are learned from
+        self._event_id: Optional[int] = None
+        self._seen_events = deque(maxlen=REORDER_WINDOW * 2)
+        # One refresh reads the database at a time; searches only wait while it applies
+        self._refresh_lock = threading.Lock()
+
+    def mark_dirty(self, content_type: str) -> None:
+        self._dirty.add(content_type)
+
+    def _remove(self, key: tuple) -> None:
+        docno = self._docno.pop(key, None)
+        if docno is not None:
+            self._docs[docno] = None
+            self._dead += 1
+
+    def _add(self, content_type: str, item_id: int, slug: str, title: str, tags: str, status: str) -> None:
+        self._remove((content_type, item_id))
+        grams = trigrams(" ".join((title, slug.replace("-", " "), tags.replace(",", " "))))
+        docno = len(self._docs)
+        self._docs.append((content_type, item_id, slug, title, status == "published"))
+        self._sizes.append(min(len(grams), 65535))
+        self._docno[(content_type, item_id)] = docno
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array("I")
+            postings.append(docno)
+
+    def _compact(self) -> None:
+        docs = [doc for doc in self._docs if doc is not None]
+        postings: Dict[str, array] = {}
+        renumber = {}
+        for old_docno, doc in enumerate(self._docs):
+            if doc is not None:
+                renumber[old_docno] = len(renumber)
+        for gram, old in self._postings.items():
+            new = array("I", (renumber[docno] for docno in old if docno in renumber))
+            if new:
+                postings[gram] = new
+        self._sizes = array("H", (self._sizes[old_docno] for old_docno in renumber))
+        self._docs = docs
+        self._docno = {(doc[0], doc[1]): docno for docno, doc in enumerate(docs)}
+        self._postings = postings
+        self._dead = 0
+
+    def _read_removed(self, db: Session):
+        """Items deleted or archived since the last refresh, and the events read.
+
+        Returns None for the items when events were pruned past the last
+        position, in which case deletes are found by comparing ids instead.
+        """
+        event = models.ChangeEvent
+        if self._event_id is None:
+            # First load: everything live is read anyway
+            return set(), [db.query(func.max(event.id)).scalar() or 0]
+        oldest = db.query(func.min(event.id)).scalar()
+        # An empty table after events were seen means they were all pruned
+        if oldest is None and self._event_id > 0 or oldest is not None and oldest > self._event_id + 1:
+            return None, [db.query(func.max(event.id)).scalar() or 0]
+        # Ids commit out of order, so re-read a window back, as the change feed does
+        seen = set(self._seen_events)
+        rows = db.query(event.id, event.content_type, event.content_id, event.action, event.status).filter(
+            event.id > self._event_id - REORDER_WINDOW
+        ).order_by(event.id)
+        removed = set()
+        event_ids = []
+        for event_id, content_type, content_id, action, status in rows:
+            if event_id <= self._event_id and event_id in seen:
+                continue
+            event_ids.append(event_id)
+            if action == "deleted" or status == "archived":
+                removed.add((content_type, content_id))
+            else:
+                removed.discard((content_type, content_id))
+        return removed, event_ids
+
+    def _read_changed(self, db: Session, content_type: str) -> list:
+        """Rows of ``content_type`` inserted or updated since its last refresh."""
+        model = models.CONTENT_MODELS[content_type]
+        query = db.query(model.id, model.slug, model.title, model.tags, model.status, model.updated_at)
+        watermark = self._watermarks.get(content_type)
+        if watermark is not None:
+            query = query.filter(model.updated_at >= watermark - WATERMARK_MARGIN)
+        return query.all()
+
+    def refresh(self) -> None:
+        """Apply pending changes for tables marked dirty.
+
+        The database is read without holding the index lock, so concurrent
+        searches only wait while the changes are applied.
+        """
+        if not self._dirty:
+            return
+        with self._refresh_lock:
+            dirty = set()
+            while self._dirty:
+                dirty.add(self._dirty.pop())
+            if not dirty:
+                return
+            db = SessionLocal()
+            try:
+                removed, event_ids = self._read_removed(db)
+                live_ids = None
+                if removed is None:
+                    live_ids = {
+                        content_type: {row[0] for row in db.query(model.id)}
+                        for content_type, model in models.CONTENT_MODELS.items()
+                    }
+                changed = {content_type: self._read_changed(db, content_type) for content_type in dirty}
+            except Exception:
+                self._dirty |= dirty
+                raise
+            finally:
+                db.close()
+
+            with self._lock:
+                if live_ids is not None:
+                    removed = {key for key in self._docno if key[1] not in live_ids[key[0]]}
+                for key in removed:
+                    self._remove(key)
+                for content_type, rows in changed.items():
+                    watermark = self._watermarks.get(content_type)
+                    for item_id, slug, title, tags, status, updated_at in rows:
+                        self._add(content_type, item_id, slug, title, tags, status)
+                        if watermark is None or updated_at > watermark:
+                            watermark = updated_at
+                    if watermark is not None:
+                        self._watermarks[content_type] = watermark
+                if self._dead > COMPACT_RATIO * max(len(self._docs), 1):
+                    self._compact()
+            self._seen_events.extend(event_ids)
+            self._event_id = max([self._event_id or 0] + event_ids)
+
+    def search(self, q: str, include_drafts: bool = False, content_type: Optional[str] = None, limit: int = 20) -> List[dict]:
+        query_grams = trigrams(q)
+        if not query_grams:
+            return []
+        self.refresh()
+        with self._lock:
+            wanted = len(query_grams)
+            min_common = max(1, math.ceil(MIN_SIMILARITY * wanted))
+            lists = sorted((self._postings[gram] for gram in query_grams if gram in self._postings), key=len)
+            if len(lists) < min_common:
+                return []
+            # A match holds min_common of the query's trigrams, so it must appear in
+            # one of the rarest len(lists) - min_common + 1 lists. Count those in C
+            # and probe the frequent lists (sorted by docno) only for candidates.
+            split = len(lists) - min_common + 1
+            counts = Counter(chain.from_iterable(lists[:split]))
+            frequent = lists[split:]
+            best = []  # min-heap of (score, jaccard, docno), at most ``limit`` long
+            # Visit candidates by descending count so the rest can be skipped once
+            # even a hit in every frequent list could not reach the current top
+            for docno, common in counts.most_common():
+                if len(best) == limit and (common + len(frequent)) / wanted <= best[0][0]:
+                    break
+                doc = self._docs[docno]
+                if doc is None or (content_type and doc[0] != content_type) or (not include_drafts and not doc[4]):
+                    continue
+                for postings in frequent:
+                    i = bisect_left(postings, docno)
+                    if i < len(postings) and postings[i] == docno:
+                        common += 1
+                if common < min_common:
+                    continue
+                # Break ties in favour of shorter documents, as a Jaccard-style score would
+                entry = (common / wanted, common / (wanted + self._sizes[docno] - common), docno)
+                if len(best) < limit:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+            best.sort(reverse=True)
+            return [
+                {
+                    "type": self._docs[docno][0],
+                    "id": self._docs[docno][1],
+                    "slug": self._docs[docno][2],
+                    "title": self._docs[docno][3],
+                    "score": round(score, 3),
+                }
+                for score, _, docno in best
+            ]
+
+
+index = TrigramIndex()
+
+for _content_type in models.CONTENT_MODELS:
+    invalidation.subscribe(_content_type, index.mark_dirty)
+
+
+@tasks.register("publish")
+def warm_search_index(db: Session, job: models.OutboxJob):
+    """Apply the published change to this worker's index before anyone searches for it."""
+    # This worker may not have seen the writer's table version bump yet
+    index.mark_dirty(job.content_type)
+    index.refresh()
@@ -0,0 +1,116 @@
+import re
+from typing import Iterable, List
+
+from sqlalchemy import delete, event, exists, inspect, insert, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Headings at or above this depth start a new section; deeper ones stay inside it
+MAX_SECTION_LEVEL = 3
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})[ \t]+(.*?)[ \t#]*$")
+FENCE_PATTERN = re.compile(r"^[ \t]*(```|~~~)")
+
+
+def _anchor(title: str, seen: dict) -> str:
+    base = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-") or "section"
+    count = seen.get(base, 0)
+    seen[base] = count + 1
+    return base if count == 0 else f"{base}-{count}"
+
+
+def parse_sections(mdx: str) -> List[dict]:
+    """Split MDX into heading-delimited sections with character offsets.
+
+    Text before the first heading becomes an untitled level-0 section.
+    Headings inside fenced code blocks are ignored.
+    """
+    if not mdx.strip():
+        return []
+
+    starts = []
+    offset = 0
+    in_fence = False
+    for line in mdx.splitlines(keepends=True):
+        if FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = HEADING_PATTERN.match(line.rstrip("\r\n"))
+            if match and len(match.group(1)) <= MAX_SECTION_LEVEL:
+                starts.append((offset, len(match.group(1)), match.group(2).strip()))
+        offset += len(line)
+
+    if not starts or mdx[:starts[0][0]].strip():
+        starts.insert(0, (0, 0, ""))
+
+    seen = {}
+    sections = []
+    for position, (start, level, title) in enumerate(starts):
+        end = starts[position + 1][0] if position + 1 < len(starts) else len(mdx)
+        sections.append({
+            "position": position,
+            "anchor": _anchor(title or "introduction", seen),
+            "title": title[:255],
+            "level": level,
+            "start_offset": start,
+            "end_offset": end,
+        })
+    return sections
+
+
+def _forget(connection, content_type: str, content_ids: Iterable[int]) -> None:
+    connection.execute(delete(models.ContentSection).where(
+        models.ContentSection.content_type == content_type,
+        models.ContentSection.content_id.in_(list(content_ids)),
+    ))
+
+
+def _index(connection, content_type: str, content_id: int, mdx: str) -> None:
+    _forget(connection, content_type, [content_id])
+    rows = [
+        {"content_type": content_type, "content_id": content_id, **section}
+        for section in parse_sections(mdx)
+    ]
+    if rows:
+        connection.execute(insert(models.ContentSection), rows)
+
+
+def forget(db: Session, content_type: str, content_ids: Iterable[int]) -> None:
+    """Drop the section index of deleted items (for set-based deletes)."""
+    _forget(db.connection(), content_type, content_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _reindex_flushed(session: Session, flush_context):
+    for obj in session.new:
+        content_type = models.TABLE_CONTENT_TYPES.get(getattr(obj, "__tablename__", None))
+        if content_type:
+            _index(session.connection(), content_type, obj.id, obj.content_mdx)
+    for obj in session.dirty:
+        content_type = models.TABLE_CONTENT_TYPES.get(getattr(obj, "__tablename__", None))
+        if content_type and inspect(obj).attrs.content_mdx.history.has_changes():
+            _index(session.connection(), content_type, obj.id, obj.content_mdx)
+    for obj in session.deleted:
+        content_type = models.TABLE_CONTENT_TYPES.get(getattr(obj, "__tablename__", None))
+        if content_type:
+            _forget(session.connection(), content_type, [obj.id])
+
+
+def ensure_initialized(db: Session) -> None:
+    """Index content written before sections existed."""
+    for content_type, model in models.CONTENT_MODELS.items():
+        missing = db.query(model.id, model.content_mdx).filter(~exists().where(
+            models.ContentSection.content_type == content_type,
+            models.ContentSection.content_id == model.id,
+        ), model.content_mdx != "")
+        for item_id, mdx in missing.all():
+            _index(db.connection(), content_type, item_id, mdx)
+    db.commit()
+
+
+def table_of_contents(db: Session, content_type: str, content_id: int) -> List[models.ContentSection]:
+    return db.execute(select(models.ContentSection).where(
+        models.ContentSection.content_type == content_type,
+        models.ContentSection.content_id == content_id,
+    ).order_by(models.ContentSection.position)).scalars().all()
@@ -0,0 +1,152 @@
+import sys
+import threading
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal, engine, Base, upsert
+from . import models, invalidation
+
+# Columns counted per content type; tags are split on commas
+FACETS = ("status", "difficulty", "tags")
+
+_cache: Optional[dict] = None
+_cache_generation = 0
+_cache_lock = threading.Lock()
+
+
+def facet_values(facet: str, value: Optional[str]) -> Iterable[str]:
+    if value is None:
+        return ()
+    if facet == "tags":
+        return [tag.strip() for tag in value.split(",") if tag.strip()]
+    return (value,)
+
+
+def add_item(deltas: Counter, content_type: str, item, sign: int) -> None:
+    """Count every facet value of ``item`` (a row or object) with weight ``sign``."""
+    for facet in FACETS:
+        for value in facet_values(facet, getattr(item, facet)):
+            deltas[(content_type, facet, value)] += sign
+
+
+def apply_deltas(connection, deltas: Counter) -> None:
+    """Add ``deltas`` to the stored counters with one upsert per changed key."""
+    rows = [
+        {"content_type": content_type, "facet": facet, "value": value, "count": delta}
+        for (content_type, facet, value), delta in deltas.items() if delta
+    ]
+    if not rows:
+        return
+    upsert(connection, models.ContentStat, rows, lambda excluded: {"count": models.ContentStat.count + excluded.count})
+
+
+@event.listens_for(Session, "after_flush")
+def _count_flushed(session: Session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        content_type = models.TABLE_CONTENT_TYPES.get(getattr(obj, "__tablename__", None))
+        if content_type:
+            add_item(deltas, content_type, obj, 1)
+    for obj in session.deleted:
+        content_type = models.TABLE_CONTENT_TYPES.get(getattr(obj, "__tablename__", None))
+        if content_type:
+            add_item(deltas, content_type, obj, -1)
+    for obj in session.dirty:
+        content_type = models.TABLE_CONTENT_TYPES.get(getattr(obj, "__tablename__", None))
+        if not content_type:
+            continue
+        state = inspect(obj)
+        for facet in FACETS:
+            history = state.attrs[facet].history
+            if not history.has_changes():
+                continue
+            for old in history.deleted:
+                for value in facet_values(facet, old):
+                    deltas[(content_type, facet, value)] -= 1
+            for new in history.added:
+                for value in facet_values(facet, new):
+                    deltas[(content_type, facet, value)] += 1
+    apply_deltas(session.connection(), deltas)
+
+
+def _drop_cache(table: str) -> None:
+    global _cache, _cache_generation
+    _cache_generation += 1
+    _cache = None
+
+
+# Reconciling rewrites the counters without touching content, so track them too
+invalidation.TRACKED_TABLES.add("content_stats")
+_ARCHIVE_TABLES = [model.__tablename__ for model in models.ARCHIVE_MODELS.values()]
+for _table in list(models.CONTENT_MODELS) + _ARCHIVE_TABLES + ["content_stats"]:
+    invalidation.subscribe(_table, _drop_cache)
+
+
+def get_stats(db: Session) -> dict:
+    """All facets for all content types, served from memory between writes."""
+    global _cache
+    cached = _cache
+    if cached is not None:
+        return cached
+    with _cache_lock:
+        if _cache is not None:
+            return _cache
+        generation = _cache_generation
+        stats = {
+            content_type: {"total": 0, **{facet: {} for facet in FACETS}}
+            for content_type in models.CONTENT_MODELS
+        }
+        rows = db.execute(select(
+            models.ContentStat.content_type, models.ContentStat.facet,
+            models.ContentStat.value, models.ContentStat.count,
+        )).all()
+        for content_type, facet, value, count in rows:
+            if content_type in stats and facet in FACETS and count:
+                stats[content_type][facet][value] = count
+        for content_type in stats:
+            stats[content_type]["total"] = sum(stats[content_type]["status"].values())
+        # A write that lands mid-read must not be masked by this result
+        if generation == _cache_generation:
+            _cache = stats
+        return stats
+
+
+def reconcile(db: Session) -> Counter:
+    """Rebuild every counter from the content tables and their archive tier."""
+    counts = Counter()
+    for content_type, model in models.CONTENT_MODELS.items():
+        for tier in (model, models.ARCHIVE_MODELS[content_type]):
+            for row in db.query(tier.status, tier.difficulty, tier.tags).yield_per(1000):
+                add_item(counts, content_type, row, 1)
+    db.query(models.ContentStat).delete(synchronize_session=False)
+    apply_deltas(db.connection(), counts)
+    db.commit()
+    return counts
+
+
+def ensure_initialized(db: Session) -> None:
+    """Build the counters once for databases that predate them."""
+    if db.query(models.ContentStat.content_type).first() is not None:
+        return
+    if any(db.query(model.id).first() is not None for model in models.CONTENT_MODELS.values()):
+        reconcile(db)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["reconcile"]:
+        print("Usage: python -m backend.stats reconcile")
+        sys.exit(2)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        counts = reconcile(db)
+    finally:
+        db.close()
+    totals = defaultdict(int)
+    for (content_type, facet, _), count in counts.items():
+        if facet == "status":
+            totals[content_type] += count
+    print(f"Reconciled content stats: {dict(totals)}")
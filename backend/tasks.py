@@ -0,0 +1,205 @@
+import asyncio
+import os
+import re
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal
+from . import models
+from .background import BackgroundLoop
+
+# Configuration
+POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+STALE_JOB_MINUTES = 10  # running jobs older than this are assumed orphaned by a dead worker
+DONE_RETENTION_HOURS = 24
+BATCH_SIZE = 20
+
+Handler = Callable[[Session, models.OutboxJob], None]
+HANDLERS: Dict[str, List[Handler]] = defaultdict(list)
+
+LINK_PATTERN = re.compile(r"\[\[(concept|implementation|problem):([a-zA-Z0-9_-]+)(?:\|([^\]]*))?\]\]")
+
+
+def register(kind: str):
+    """Register a handler to run for every job of ``kind``."""
+    def decorator(fn: Handler) -> Handler:
+        HANDLERS[kind].append(fn)
+        return fn
+    return decorator
+
+
+def enqueue(db: Session, kind: str, content_type: str, content_id: int) -> None:
+    """Add a job to the outbox as part of the caller's transaction.
+
+    The job becomes visible to workers only when the caller commits, and a
+    job already pending for the same content is not duplicated.
+    """
+    enqueue_many(db, kind, content_type, [content_id])
+
+
+def enqueue_many(db: Session, kind: str, content_type: str, content_ids: List[int]) -> None:
+    """Like ``enqueue`` for many items of one type, with a single lookup."""
+    if not content_ids:
+        return
+    pending = {row.content_id for row in db.query(models.OutboxJob.content_id).filter(
+        models.OutboxJob.kind == kind,
+        models.OutboxJob.content_type == content_type,
+        models.OutboxJob.content_id.in_(content_ids),
+        models.OutboxJob.status == "pending",
+    ).all()}
+    new_ids = [content_id for content_id in dict.fromkeys(content_ids) if content_id not in pending]
+    if not new_ids:
+        return
+    db.add_all([
+        models.OutboxJob(kind=kind, content_type=content_type, content_id=content_id)
+        for content_id in new_ids
+    ])
+    db.info["outbox_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session: Session):
+    if session.info.pop("outbox_dirty", False):
+        queue.wake()
+
+
+class JobQueue(BackgroundLoop):
+    """Asyncio consumer of the outbox table, one per worker process."""
+
+    name = "Job queue poll"
+
+    def __init__(self):
+        super().__init__(POLL_INTERVAL_SECONDS)
+        self._last_prune = 0.0
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.latencies_ms = deque(maxlen=1000)
+
+    async def step(self) -> bool:
+        # Keep going while batches come back non-empty
+        return await asyncio.to_thread(self._run_batch) > 0
+
+    def _requeue_stale(self):
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(minutes=STALE_JOB_MINUTES)
+            db.query(models.OutboxJob).filter(
+                models.OutboxJob.status == "running",
+                models.OutboxJob.started_at < cutoff,
+            ).update({"status": "pending"}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _run_batch(self) -> int:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            job_ids = [row.id for row in db.query(models.OutboxJob.id).filter(
+                models.OutboxJob.status == "pending",
+                models.OutboxJob.run_after <= now,
+            ).order_by(models.OutboxJob.id).limit(BATCH_SIZE).all()]
+
+            ran = 0
+            for job_id in job_ids:
+                # Claim the job; another worker may have taken it first
+                claimed = db.query(models.OutboxJob).filter(
+                    models.OutboxJob.id == job_id,
+                    models.OutboxJob.status == "pending",
+                ).update({"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+                if claimed:
+                    self._execute(db, db.get(models.OutboxJob, job_id))
+                    ran += 1
+
+            if time.monotonic() - self._last_prune > 3600:
+                self._last_prune = time.monotonic()
+                # Retry jobs left running by a worker that died
+                self._requeue_stale()
+                cutoff = now - timedelta(hours=DONE_RETENTION_HOURS)
+                db.query(models.OutboxJob).filter(
+                    models.OutboxJob.status == "done",
+                    models.OutboxJob.finished_at < cutoff,
+                ).delete(synchronize_session=False)
+                db.commit()
+            return ran
+        finally:
+            db.close()
+
+    def _execute(self, db: Session, job: models.OutboxJob):
+        try:
+            for handler in HANDLERS[job.kind]:
+                handler(db, job)
+            job.status = "done"
+            job.finished_at = datetime.utcnow()
+            job.last_error = None
+            db.commit()
+            self.processed += 1
+            self.latencies_ms.append((job.finished_at - job.created_at).total_seconds() * 1000)
+        except Exception as e:
+            db.rollback()
+            job.attempts += 1
+            job.last_error = str(e)[:1000]
+            if job.attempts >= MAX_ATTEMPTS:
+                job.status = "failed"
+                job.finished_at = datetime.utcnow()
+                self.failed += 1
+            else:
+                job.status = "pending"
+                job.run_after = datetime.utcnow() + timedelta(seconds=2 ** job.attempts)
+                self.retried += 1
+            db.commit()
+            print(f"Job {job.id} ({job.kind} {job.content_type}/{job.content_id}) failed: {e}")
+
+    def stats(self, db: Session) -> dict:
+        counts = dict(
+            db.query(models.OutboxJob.status, func.count(models.OutboxJob.id))
+            .group_by(models.OutboxJob.status).all()
+        )
+        latencies = sorted(self.latencies_ms)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1)
+
+        return {
+            "depth": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "failed": counts.get("failed", 0),
+            "processed": self.processed,
+            "retried": self.retried,
+            "failed_here": self.failed,
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+        }
+
+
+queue = JobQueue()
+
+
+@register("publish")
+def extract_links(db: Session, job: models.OutboxJob):
+    """Store the [[type:slug|title]] links found in published content."""
+    model = models.CONTENT_MODELS[job.content_type]
+    item = db.query(model.content_mdx).filter(model.id == job.content_id).first()
+    db.query(models.ContentLink).filter(
+        models.ContentLink.source_type == job.content_type,
+        models.ContentLink.source_id == job.content_id,
+    ).delete(synchronize_session=False)
+    if item is None:
+        return
+    for target_type, target_slug, title in LINK_PATTERN.findall(item.content_mdx):
+        db.add(models.ContentLink(
+            source_type=job.content_type,
+            source_id=job.content_id,
+            target_type=target_type,
+            target_slug=target_slug,
+            title=(title or "")[:255],
+        ))
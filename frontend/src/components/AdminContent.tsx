@@ -1,8 +1,9 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { useAuth } from '../contexts/AuthContext'
 import { useNavigate } from 'react-router-dom'
 import { MDXRenderer } from './MDXRenderer'
-import { Plus, Edit, Trash2, Eye, EyeOff, BookOpen, Code, Target } from 'lucide-react'
+import { useChangeFeed, upsertItem, ContentChange } from '../hooks/useChangeFeed'
+import { Plus, Edit, Trash2, Eye, EyeOff, BookOpen, Code, Target, Archive, ArchiveRestore } from 'lucide-react'
 
 interface ContentItem {
   id: number
@@ -31,10 +32,16 @@ export const AdminContent: React.FC<AdminContentProps> = ({ contentType }) => {
   const [selected, setSelected] = useState<ContentItem | null>(null)
   const [error, setError] = useState<string | null>(null)
   const [loading, setLoading] = useState(true)
+  const [checked, setChecked] = useState<Set<number>>(new Set())
+  // Archived items live in a separate tier and are listed on their own
+  const [showArchived, setShowArchived] = useState(false)
 
   const contentTypeSingular = contentType.slice(0, -1) // Remove 's'
   const apiEndpoint = `/api/${contentType}`
   const title = contentType.charAt(0).toUpperCase() + contentType.slice(1)
+  const listUrl = showArchived ? `${apiEndpoint}/?status=archived` : `${apiEndpoint}/`
+
+  const inView = (status: string | null) => showArchived ? status === 'archived' : status !== 'archived'
 
   const getIcon = () => {
     switch (contentType) {
@@ -69,7 +76,8 @@ export const AdminContent: React.FC<AdminContentProps> = ({ contentType }) => {
     fetchItems()
     // Clear selection when content type changes
     setSelected(null)
-  }, [contentType])
+    setChecked(new Set())
+  }, [contentType, showArchived])
 
   useEffect(() => {
     console.log('AdminContent: items state changed, count:', items.length, 'items:', items.map((item: any) => ({ id: item.id, title: item.title, status: item.status })))
@@ -77,8 +85,8 @@ export const AdminContent: React.FC<AdminContentProps> = ({ contentType }) => {
 
   const fetchItems = async () => {
     try {
-      console.log('AdminContent: Fetching items from:', `${apiEndpoint}/`)
-      const response = await fetch(`${apiEndpoint}/`, {
+      console.log('AdminContent: Fetching items from:', listUrl)
+      const response = await fetch(listUrl, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
@@ -107,6 +115,49 @@ export const AdminContent: React.FC<AdminContentProps> = ({ contentType }) => {
     }
   }
 
+  const itemsRef = useRef(items)
+  itemsRef.current = items
+
+  // Apply edits from other tabs and admins without re-fetching the whole list
+  const applyChange = async (change: ContentChange) => {
+    if (change.type !== contentType) return
+    if (change.action === 'deleted' || change.action === 'removed' || !inView(change.status)) {
+      setItems(prev => prev.filter(i => i.id !== change.id))
+      setSelected(prev => prev?.id === change.id ? null : prev)
+      return
+    }
+    const current = itemsRef.current.find(i => i.id === change.id)
+    if (current && current.updated_at === change.updated_at) return
+
+    try {
+      const response = await fetch(`${apiEndpoint}/${change.id}`, {
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      })
+      if (response.ok) {
+        const item = await response.json()
+        setItems(prev => upsertItem(prev, item))
+        setSelected(prev => prev?.id === item.id ? item : prev)
+      }
+    } catch (error) {
+      console.error('Error applying change:', error)
+    }
+  }
+
+  useChangeFeed(token, applyChange, fetchItems)
+
+  // Show an item's new state, or drop it once it belongs to the other list
+  const showResult = (item: ContentItem) => {
+    if (inView(item.status)) {
+      setItems(prev => prev.map(i => i.id === item.id ? item : i))
+      setSelected(prev => prev?.id === item.id ? item : prev)
+    } else {
+      setItems(prev => prev.filter(i => i.id !== item.id))
+      setSelected(prev => prev?.id === item.id ? null : prev)
+    }
+  }
+
   const createItem = async () => {
     const newSlug = prompt(`Slug for new ${contentTypeSingular}? (e.g., ${contentTypeSingular}-basics)`)
     if (!newSlug) return
@@ -131,7 +182,10 @@ export const AdminContent: React.FC<AdminContentProps> = ({ contentType }) => {
 
       if (response.ok) {
         const item = await response.json()
-        setItems(prev => [item, ...prev])
+        // The change feed may have delivered it already
+        if (inView(item.status)) {
+          setItems(prev => upsertItem(prev, item))
+        }
         setSelected(item)
         setError(null)
       } else if (response.status === 401) {
@@ -187,11 +241,7 @@ export const AdminContent: React.FC<AdminContentProps> = ({ contentType }) => {
       })
 
       if (response.ok) {
-        const updatedItem = await response.json()
-        setItems(prev => prev.map(i => i.id === itemId ? updatedItem : i))
-        if (selected?.id === itemId) {
-          setSelected(updatedItem)
-        }
+        showResult(await response.json())
         setError(null)
       } else if (response.status === 401) {
         setError('Authentication failed. Please log in again.')
@@ -206,6 +256,89 @@ export const AdminContent: React.FC<AdminContentProps> = ({ contentType }) => {
     }
   }
 
+  const unarchiveItem = async (itemId: number) => {
+    try {
+      const response = await fetch(`${apiEndpoint}/${itemId}/unarchive`, {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      })
+
+      if (response.ok) {
+        showResult(await response.json())
+        setError(null)
+      } else if (response.status === 401) {
+        setError('Authentication failed. Please log in again.')
+        logout()
+      } else {
+        const errorData = await response.json()
+        setError(errorData.detail || 'Failed to unarchive item')
+      }
+    } catch (error) {
+      console.error('Error unarchiving item:', error)
+      setError('Failed to unarchive item')
+    }
+  }
+
+  const toggleChecked = (itemId: number) => {
+    setChecked(prev => {
+      const next = new Set(prev)
+      if (next.has(itemId)) {
+        next.delete(itemId)
+      } else {
+        next.add(itemId)
+      }
+      return next
+    })
+  }
+
+  const bulkAction = async (action: 'publish' | 'draft' | 'archive' | 'delete') => {
+    const ids = Array.from(checked)
+    if (ids.length === 0) return
+    if (action === 'delete' && !confirm(`Are you sure you want to delete ${ids.length} items?`)) return
+
+    try {
+      const response = await fetch(`${apiEndpoint}/bulk`, {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ ids, action })
+      })
+
+      if (response.ok) {
+        const data = await response.json()
+        const results = new Map<number, { ok: boolean, status: string | null }>(
+          data.results.map((r: any) => [r.id, r])
+        )
+        const applyResult = (item: ContentItem) => {
+          const result = results.get(item.id)
+          return result?.ok && result.status ? { ...item, status: result.status } : item
+        }
+        // Deleted, or moved to the other list
+        const isGone = (item: ContentItem) => {
+          const result = results.get(item.id)
+          return !!result && result.ok && (result.status === null || !inView(result.status))
+        }
+        setItems(prev => prev.filter(i => !isGone(i)).map(applyResult))
+        setSelected(prev => prev && !isGone(prev) ? applyResult(prev) : null)
+        setChecked(new Set())
+        setError(null)
+      } else if (response.status === 401) {
+        setError('Authentication failed. Please log in again.')
+        logout()
+      } else {
+        const errorData = await response.json()
+        setError(errorData.detail || `Failed to ${action} items`)
+      }
+    } catch (error) {
+      console.error(`Error running bulk ${action}:`, error)
+      setError(`Failed to ${action} items`)
+    }
+  }
+
   const handleEdit = (item: ContentItem) => {
     navigate(`/admin/${contentType}/edit/${item.id}`)
   }
@@ -230,7 +363,41 @@ export const AdminContent: React.FC<AdminContentProps> = ({ contentType }) => {
             </div>
             <h1 className="text-2xl font-bold text-gray-900">{title} Management</h1>
           </div>
-          <p className="text-sm text-gray-500 mb-6">{items.length} items</p>
+          <div className="flex items-center justify-between mb-6">
+            <p className="text-sm text-gray-500">{items.length} {showArchived ? 'archived ' : ''}items</p>
+            <button
+              onClick={() => setShowArchived(!showArchived)}
+              className="btn btn-secondary flex items-center gap-1 text-sm"
+            >
+              <Archive className="w-4 h-4" />
+              {showArchived ? 'Show active' : 'Show archived'}
+            </button>
+          </div>
+
+          {checked.size > 0 && (
+            <div className="flex items-center gap-2 mb-4">
+              <span className="text-sm text-gray-700 flex-1">{checked.size} selected</span>
+              <button onClick={() => bulkAction('publish')} className="btn btn-success flex items-center gap-1 text-sm">
+                <Eye className="w-4 h-4" />
+                Publish
+              </button>
+              {showArchived ? (
+                <button onClick={() => bulkAction('draft')} className="btn btn-primary flex items-center gap-1 text-sm">
+                  <ArchiveRestore className="w-4 h-4" />
+                  Unarchive
+                </button>
+              ) : (
+                <button onClick={() => bulkAction('archive')} className="btn btn-primary flex items-center gap-1 text-sm">
+                  <EyeOff className="w-4 h-4" />
+                  Archive
+                </button>
+              )}
+              <button onClick={() => bulkAction('delete')} className="btn btn-danger flex items-center gap-1 text-sm">
+                <Trash2 className="w-4 h-4" />
+                Delete
+              </button>
+            </div>
+          )}
           
           <button
             onClick={createItem}
@@ -264,6 +431,13 @@ export const AdminContent: React.FC<AdminContentProps> = ({ contentType }) => {
                   <div className="p-4 flex flex-col h-full">
                     {/* Icon and title section */}
                     <div className="flex items-start gap-3 mb-3">
+                      <input
+                        type="checkbox"
+                        className="mt-2"
+                        checked={checked.has(item.id)}
+                        onClick={e => e.stopPropagation()}
+                        onChange={() => toggleChecked(item.id)}
+                      />
                       <div className="w-8 h-8 rounded-lg flex items-center justify-center bg-white/20 backdrop-blur-sm shadow-lg">
                         <div className="text-white">
                           {getIcon()}
@@ -352,7 +526,7 @@ export const AdminContent: React.FC<AdminContentProps> = ({ contentType }) => {
               
               {/* Action Buttons */}
               <div className="flex items-center gap-6">
-                {selected.status === 'draft' && (
+                {(selected.status === 'draft' || selected.status === 'archived') && (
                   <button
                     onClick={() => publishItem(selected.id)}
                     className="btn btn-success flex items-center gap-2"
@@ -361,6 +535,15 @@ export const AdminContent: React.FC<AdminContentProps> = ({ contentType }) => {
                     Publish
                   </button>
                 )}
+                {selected.status === 'archived' && (
+                  <button
+                    onClick={() => unarchiveItem(selected.id)}
+                    className="btn btn-primary flex items-center gap-2"
+                  >
+                    <ArchiveRestore className="w-4 h-4" />
+                    Unarchive
+                  </button>
+                )}
                 <button
                   onClick={() => handleEdit(selected)}
                   className="btn btn-primary flex items-center gap-2"
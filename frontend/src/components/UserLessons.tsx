@@ -1,6 +1,7 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { useAuth } from '../contexts/AuthContext'
 import { MDXRenderer } from './MDXRenderer'
+import { useChangeFeed, upsertItem, ContentChange } from '../hooks/useChangeFeed'
 import { BookOpen, Code, Target, Settings, ArrowLeft, Search } from 'lucide-react'
 import { Link, useParams, useNavigate } from 'react-router-dom'
 
@@ -21,6 +22,12 @@ interface ContentItem {
   type?: 'concepts' | 'implementations' | 'problems'
 }
 
+interface ProgressEntry {
+  content_type: string
+  content_id: number
+  status: 'started' | 'completed'
+}
+
 export default function UserLessons(): JSX.Element {
   const { token, user, logout } = useAuth()
   const { contentType, slug } = useParams<{ contentType?: string; slug?: string }>()
@@ -32,6 +39,8 @@ export default function UserLessons(): JSX.Element {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [query, setQuery] = useState('')
+  // "<type>:<id>" -> progress status
+  const [progress, setProgress] = useState<Record<string, string>>({})
 
   useEffect(() => {
     fetchAllContent()
@@ -63,10 +72,11 @@ export default function UserLessons(): JSX.Element {
       const headers: Record<string, string> = {}
       if (token) headers['Authorization'] = `Bearer ${token}`
 
-      const [conceptsRes, implementationsRes, problemsRes] = await Promise.all([
+      const [conceptsRes, implementationsRes, problemsRes, progressRes] = await Promise.all([
         fetch('/api/concepts/', { headers }),
         fetch('/api/implementations/', { headers }),
-        fetch('/api/problems/', { headers })
+        fetch('/api/problems/', { headers }),
+        fetch('/api/progress/', { headers })
       ])
 
               if (conceptsRes.ok) {
@@ -96,6 +106,11 @@ export default function UserLessons(): JSX.Element {
           setProblems(filteredProblems)
         }
 
+        if (progressRes.ok) {
+          const progressData: ProgressEntry[] = await progressRes.json()
+          setProgress(Object.fromEntries(progressData.map(p => [`${p.content_type}:${p.content_id}`, p.status])))
+        }
+
       setError(null)
     } catch (err) {
       console.error('Error fetching content:', err)
@@ -105,6 +120,43 @@ export default function UserLessons(): JSX.Element {
     }
   }
 
+  const setters = {
+    concepts: setConcepts,
+    implementations: setImplementations,
+    problems: setProblems
+  }
+  const lists = useRef({ concepts, implementations, problems })
+  lists.current = { concepts, implementations, problems }
+
+  // Keep the lists current from the change feed instead of re-fetching them
+  const applyChange = async (change: ContentChange) => {
+    const setList = setters[change.type]
+    if (!setList) return
+    const hidden = !user?.is_admin && change.status !== 'published'
+    if (change.action === 'deleted' || change.action === 'removed' || hidden) {
+      setList(prev => prev.filter(i => i.id !== change.id))
+      setSelectedItem(prev => prev && prev.type === change.type && prev.id === change.id ? null : prev)
+      return
+    }
+    const current = lists.current[change.type].find(i => i.id === change.id)
+    if (current && current.updated_at === change.updated_at) return
+
+    try {
+      const headers: Record<string, string> = {}
+      if (token) headers['Authorization'] = `Bearer ${token}`
+      const response = await fetch(`/api/${change.type}/${change.id}`, { headers })
+      if (response.ok) {
+        const item: ContentItem = await response.json()
+        setList(prev => upsertItem(prev, item))
+        setSelectedItem(prev => prev && prev.type === change.type && prev.id === item.id ? { ...item, type: change.type } : prev)
+      }
+    } catch (err) {
+      console.error('Error applying change:', err)
+    }
+  }
+
+  useChangeFeed(token, applyChange, fetchAllContent)
+
   const getIcon = (type: string) => {
     switch (type) {
       case 'concepts': return <BookOpen className="w-5 h-5" />
@@ -177,6 +229,30 @@ export default function UserLessons(): JSX.Element {
     }
   }
 
+  const markProgress = async (item: ContentItem, status: 'started' | 'completed') => {
+    const key = `${item.type}:${item.id}`
+    const previous = progress[key]
+    setProgress(prev => ({ ...prev, [key]: status }))
+    try {
+      const headers: Record<string, string> = { 'Content-Type': 'application/json' }
+      if (token) headers['Authorization'] = `Bearer ${token}`
+      const response = await fetch(`/api/progress/${item.type}/${item.id}`, {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({ status })
+      })
+      if (!response.ok) throw new Error(`HTTP ${response.status}`)
+    } catch (err) {
+      console.error('Error saving progress:', err)
+      setProgress(prev => {
+        const next = { ...prev }
+        if (previous) next[key] = previous
+        else delete next[key]
+        return next
+      })
+    }
+  }
+
   const handleBackClick = () => {
     setSelectedItem(null)
     navigate('/')
@@ -241,6 +317,17 @@ export default function UserLessons(): JSX.Element {
                       <><span>•</span><span>Tags: {selectedItem.tags}</span></>
                     )}
                   </div>
+                  <div className="mt-4">
+                    {progress[`${selectedItem.type}:${selectedItem.id}`] === 'completed' ? (
+                      <button onClick={() => markProgress(selectedItem, 'started')} className="btn btn-secondary">
+                        Completed ✓ (mark as not done)
+                      </button>
+                    ) : (
+                      <button onClick={() => markProgress(selectedItem, 'completed')} className="btn btn-primary">
+                        Mark as completed
+                      </button>
+                    )}
+                  </div>
                 </div>
               </div>
                        </div>
@@ -341,6 +428,9 @@ export default function UserLessons(): JSX.Element {
                            {item.status === 'archived' && (
                              <span className="px-2 py-1 rounded text-xs font-medium bg-gray-200 backdrop-blur-sm" style={{ color: 'black' }}>Archived</span>
                            )}
+                           {progress[`${item.type}:${item.id}`] === 'completed' && (
+                             <span className="px-2 py-1 rounded text-xs font-medium bg-green-200 backdrop-blur-sm" style={{ color: 'black' }}>Completed</span>
+                           )}
                          </div>
                        </div>
                      </div>
@@ -0,0 +1,88 @@
+import { useEffect, useRef } from 'react'
+
+export type ContentType = 'concepts' | 'implementations' | 'problems'
+
+export interface ContentChange {
+  type: ContentType
+  id: number
+  action: 'created' | 'updated' | 'deleted' | 'removed'
+  status: string | null
+  updated_at: string | null
+}
+
+// Delay before opening a new stream after one fails or ends
+const RECONNECT_MS = 3000
+
+// Subscribes to the /api/changes event stream while logged in. EventSource
+// cannot send an Authorization header, so each connection is opened with a
+// single-use ticket; after an error the hook fetches a new one and resumes
+// from the last event id, so missed changes are replayed. A 'reset' event
+// means too much was missed and lists should reload.
+export function useChangeFeed(
+  token: string | null,
+  onChange: (change: ContentChange) => void,
+  onReset: () => void
+) {
+  const handlers = useRef({ onChange, onReset })
+  handlers.current = { onChange, onReset }
+
+  useEffect(() => {
+    if (!token) return
+    let source: EventSource | null = null
+    let lastEventId = ''
+    let retry: number | undefined
+    let closed = false
+
+    const reconnect = () => {
+      if (!closed) retry = window.setTimeout(connect, RECONNECT_MS)
+    }
+
+    const connect = async () => {
+      try {
+        const response = await fetch('/api/changes/ticket', {
+          method: 'POST',
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        })
+        if (!response.ok) throw new Error(`ticket request failed with ${response.status}`)
+        const { ticket } = await response.json()
+        if (closed) return
+        const params = new URLSearchParams({ ticket })
+        if (lastEventId) params.set('since', lastEventId)
+        source = new EventSource(`/api/changes/?${params}`)
+        source.addEventListener('change', (event) => {
+          lastEventId = (event as MessageEvent).lastEventId || lastEventId
+          handlers.current.onChange(JSON.parse((event as MessageEvent).data))
+        })
+        source.addEventListener('reset', (event) => {
+          lastEventId = (event as MessageEvent).lastEventId || lastEventId
+          handlers.current.onReset()
+        })
+        // The browser would retry with the used ticket, so reconnect here instead
+        source.onerror = () => {
+          source?.close()
+          source = null
+          reconnect()
+        }
+      } catch (error) {
+        console.error('Error opening change feed:', error)
+        reconnect()
+      }
+    }
+
+    connect()
+    return () => {
+      closed = true
+      window.clearTimeout(retry)
+      source?.close()
+    }
+  }, [token])
+}
+
+// Put a fetched item in place of its old copy, or at the front if it is new
+export function upsertItem<T extends { id: number }>(items: T[], item: T): T[] {
+  return items.some(i => i.id === item.id)
+    ? items.map(i => i.id === item.id ? item : i)
+    : [item, ...items]
+}
@@ -12,6 +12,8 @@ export default defineConfig({
       '/api': {
         target: 'http://web:8000',
         changeOrigin: true,
+        // Pass the browser's address on, so rate limits are per client, not per proxy
+        xfwd: true,
       },
     },
   },
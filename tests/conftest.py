@@ -0,0 +1,31 @@
+"""Every test module shares one throwaway database; the app reads its URL at import."""
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+
+import pytest
+
+from backend.db import SessionLocal
+from backend import auth, models
+
+
+@pytest.fixture(scope="session")
+def make_user():
+    """Create a user with password "secret1" unless they exist. Admins are made
+    explicitly, so no module relies on registering the first user."""
+    def make_user(username: str, is_admin: bool = False) -> None:
+        db = SessionLocal()
+        try:
+            if db.query(models.User).filter(models.User.username == username).first() is None:
+                db.add(models.User(
+                    username=username,
+                    email=f"{username}@example.com",
+                    hashed_password=auth.get_password_hash("secret1"),
+                    is_admin=is_admin,
+                ))
+                db.commit()
+        finally:
+            db.close()
+    return make_user
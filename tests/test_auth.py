@@ -0,0 +1,118 @@
+"""Tokens are checked against a map of the users whose claims can go stale
+(admins, and users whose token version changed recently) instead of a users
+query per request. These cover revocation through that map."""
+import time
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from backend.main import app
+from backend.db import SessionLocal, engine
+from backend import auth, models
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def reloads(monkeypatch):
+    """Record every reload of the token state map."""
+    calls = []
+    reload = auth.token_state._reload
+
+    def counted():
+        calls.append(time.monotonic())
+        reload()
+
+    monkeypatch.setattr(auth.token_state, "_reload", counted)
+    return calls
+
+
+def login(client, username):
+    response = client.post("/api/auth/token", data={"username": username, "password": "secret1"})
+    assert response.status_code == 200, response.text
+    return response.json()["access_token"]
+
+
+def get(client, path, token):
+    return client.get(path, headers={"Authorization": f"Bearer {token}"}).status_code
+
+
+def logout(client, token):
+    response = client.post("/api/auth/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 204, response.text
+
+
+def age_map(seconds):
+    # As if the map was loaded this much earlier, still within TOKEN_STATE_REFRESH_SECONDS
+    auth.token_state._loaded_at -= seconds
+
+
+def test_logout_revokes_existing_tokens(client, make_user):
+    make_user("alice")
+    token = login(client, "alice")
+    assert get(client, "/api/auth/me", token) == 200
+
+    logout(client, token)
+    assert get(client, "/api/auth/me", token) == 401
+    assert get(client, "/api/auth/me", login(client, "alice")) == 200
+
+
+def test_demoted_admin_token_is_rejected(client, make_user):
+    make_user("bob", is_admin=True)
+    token = login(client, "bob")
+    assert get(client, "/api/admin/stats", token) == 200
+
+    db = SessionLocal()
+    try:
+        db.query(models.User).filter(models.User.username == "bob").update({"is_admin": False})
+        db.commit()
+    finally:
+        db.close()
+    # bob is no longer held in the map, and admin claims for anyone not in it are stale
+    assert get(client, "/api/admin/stats", token) == 401
+    assert get(client, "/api/auth/me", token) == 401
+    assert get(client, "/api/auth/me", login(client, "bob")) == 200
+
+
+def test_token_issued_after_load_forces_a_reload(client, make_user, reloads):
+    make_user("carol")
+    logout(client, login(client, "carol"))
+    assert get(client, "/api/auth/me", login(client, "carol")) == 200
+
+    # Another worker revokes carol's tokens and she logs in again; this worker
+    # is not notified and its map still holds her previous version
+    with engine.begin() as connection:
+        connection.execute(
+            update(models.User)
+            .where(models.User.username == "carol")
+            .values(token_version=models.User.token_version + 1, token_version_changed_at=datetime.utcnow())
+        )
+    age_map(2)
+    token = login(client, "carol")
+    reloads.clear()
+
+    assert get(client, "/api/auth/me", token) == 200
+    assert len(reloads) == 1
+    assert get(client, "/api/auth/me", token) == 200
+    assert len(reloads) == 1
+
+
+def test_revoked_token_does_not_force_reloads(client, make_user, reloads):
+    make_user("dave")
+    token = login(client, "dave")
+    # Tokens carry whole-second iat; make this one clearly older than the next load
+    time.sleep(1.1)
+    logout(client, token)
+    assert get(client, "/api/auth/me", token) == 401
+
+    age_map(2)
+    reloads.clear()
+    for _ in range(5):
+        assert get(client, "/api/auth/me", token) == 401
+    assert reloads == []
@@ -0,0 +1,85 @@
+"""The content counters are maintained incrementally by the ORM flush hook,
+bulk actions, and the archive tier's moves. After every kind of write they
+must match a full recount of the content tables."""
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.db import SessionLocal
+from backend import stats
+
+
+@pytest.fixture(scope="module")
+def client(make_user):
+    make_user("admin", is_admin=True)
+    with TestClient(app) as client:
+        token = client.post("/api/auth/token", data={"username": "admin", "password": "secret1"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+def assert_counters_match_recount(client):
+    counted = client.get("/api/admin/stats").json()
+    db = SessionLocal()
+    try:
+        stats.reconcile(db)
+    finally:
+        db.close()
+    assert counted == client.get("/api/admin/stats").json()
+
+
+def create(client, content_type, slug, **fields):
+    response = client.post(f"/api/{content_type}/", json={"slug": slug, "title": slug.title(), **fields})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def bulk(client, content_type, ids, action):
+    response = client.post(f"/api/{content_type}/bulk", json={"ids": ids, "action": action})
+    assert response.status_code == 200, response.text
+    return response.json()["results"]
+
+
+def test_counters_follow_every_write_path(client):
+    graphs = create(client, "concepts", "graphs", difficulty="beginner", tags="graphs,bfs")
+    trees = create(client, "concepts", "trees", difficulty="advanced", tags="trees")
+    heaps = create(client, "concepts", "heaps", status="published", tags="trees,heaps")
+    knapsack = create(client, "problems", "knapsack", difficulty="intermediate", tags="dp")
+    assert_counters_match_recount(client)
+
+    response = client.put(f"/api/concepts/{graphs}", json={"difficulty": "advanced", "tags": "graphs,dfs"})
+    assert response.status_code == 200, response.text
+    assert_counters_match_recount(client)
+
+    assert all(result["ok"] for result in bulk(client, "concepts", [graphs, trees], "publish"))
+    assert_counters_match_recount(client)
+
+    assert all(result["ok"] for result in bulk(client, "concepts", [trees, heaps], "archive"))
+    assert all(result["ok"] for result in bulk(client, "problems", [knapsack], "archive"))
+    assert_counters_match_recount(client)
+
+    response = client.post(f"/api/concepts/{trees}/unarchive", params={"status": "published"})
+    assert response.status_code == 200, response.text
+    assert all(result["ok"] for result in bulk(client, "concepts", [heaps], "draft"))
+    assert_counters_match_recount(client)
+
+    response = client.put(f"/api/concepts/{graphs}", json={"status": "archived"})
+    assert response.status_code == 200, response.text
+    assert_counters_match_recount(client)
+
+    # Single-item actions on archived items
+    response = client.post(f"/api/problems/{knapsack}/publish")
+    assert response.status_code == 200, response.text
+    stale = create(client, "concepts", "stale", status="archived", tags="graphs")
+    assert client.delete(f"/api/concepts/{stale}").status_code == 204
+    assert_counters_match_recount(client)
+
+    # Deletes from both tiers
+    assert all(result["ok"] for result in bulk(client, "concepts", [graphs, trees], "delete"))
+    assert all(result["ok"] for result in bulk(client, "problems", [knapsack], "delete"))
+    assert client.delete(f"/api/concepts/{heaps}").status_code == 204
+    assert_counters_match_recount(client)
+
+    counted = client.get("/api/admin/stats").json()
+    assert counted["concepts"]["total"] == 0
+    assert counted["problems"]["total"] == 0